@@ -0,0 +1,124 @@
+"""
+Measures what gzip saves on large request and response bodies: a dashboard configuration like the one Dashboard.update()
+posts, and a batch of telemetry like Device.send_telemetry() posts, against a local stand-in server.
+
+Over loopback, bandwidth is effectively free, so the local timings mostly show what compressing costs.  To show what it
+saves, each case also reports the time projected over a slower link: the local time plus the bytes on the wire at
+LINK_MBITS.
+
+Run from the repo root with:  python -m benchmarks.bench_compression
+"""
+
+import random
+import time
+import uuid
+from typing import Any, Callable
+
+from thingsboard_api_tools.TbApi import TbApi, ACCEPT_ENCODING
+from benchmarks.stand_in_server import StandInServer
+
+
+CALLS = 20
+LINK_MBITS = 20         # A modest office or cellular uplink
+
+rng = random.Random(0)
+
+
+def dashboard_json(widgets: int) -> dict[str, Any]:
+    """ Shaped like what Dashboard.model_dump_json() produces for a large dashboard """
+    def widget() -> dict[str, Any]:
+        return {
+            "typeFullFqn": "system.cards.timeseries_table",
+            "type": "timeseries",
+            "sizeX": 8, "sizeY": 5,
+            "config": {
+                "datasources": [{
+                    "type": "entity",
+                    "entityAliasId": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "dataKeys": [
+                        {"name": key, "type": "timeseries", "label": key.title(), "color": "#2196f3", "settings": {}, "_hash": rng.random()}
+                        for key in ("temperature", "humidity", "pm25", "pm10")
+                    ],
+                }],
+                "timewindow": {"realtime": {"timewindowMs": 86_400_000}, "aggregation": {"type": "AVG", "limit": 25_000}},
+                "showTitle": True, "backgroundColor": "rgb(255, 255, 255)", "color": "rgba(0, 0, 0, 0.87)",
+                "padding": "8px", "settings": {"showTimestamp": True, "displayPagination": True, "defaultPageSize": 10},
+                "title": f"Sensor {rng.randint(1, 9999)}", "dropShadow": True, "enableFullscreen": True,
+            },
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        }
+
+    widget_list = [widget() for _ in range(widgets)]
+    return {
+        "id": {"id": str(uuid.UUID(int=rng.getrandbits(128))), "entityType": "DASHBOARD"},
+        "title": "Big dashboard",
+        "configuration": {"widgets": {w["id"]: w for w in widget_list}, "states": {}, "entityAliases": {}},
+    }
+
+
+def telemetry_json(points: int) -> list[dict[str, Any]]:
+    """ Shaped like a batch passed to Device.send_telemetry() """
+    start = 1_700_000_000_000
+    return [
+        {"ts": start + i * 60_000, "values": {"temperature": round(rng.gauss(20, 3), 2), "humidity": round(rng.gauss(50, 10), 1), "pm25": rng.randint(0, 80)}}
+        for i in range(points)
+    ]
+
+
+def timed(func: Callable[[], Any]) -> float:
+    func()      # Warm up
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func()
+    return (time.perf_counter() - start) / CALLS
+
+
+def report(label: str, seconds: float, wire_bytes: int) -> None:
+    projected = seconds + wire_bytes * 8 / (LINK_MBITS * 1_000_000)
+    print(f"  {label:<14} {wire_bytes / 1024:9.1f} KiB on the wire    {seconds * 1000:7.1f} ms local    {projected * 1000:7.1f} ms at {LINK_MBITS} Mbit/s")
+
+
+def bench_upload(label: str, params: str, payload: Any) -> None:
+    print(label)
+
+    with StandInServer() as server:
+        tbapi = TbApi(server.url, "user", "password")
+        tbapi.get_token()
+
+        for compress_over in (None, 1024):
+            tbapi.compress_requests_over = compress_over
+            server.bytes_received = 0
+            seconds = timed(lambda: tbapi.post(params, payload, "Error"))
+            report("gzipped" if compress_over else "uncompressed", seconds, server.bytes_received // (CALLS + 1))
+
+        tbapi.close()
+
+
+def bench_download(label: str, payload: Any) -> None:
+    print(label)
+
+    with StandInServer(get_payload=payload, compress_responses=True) as server:
+        tbapi = TbApi(server.url, "user", "password")
+        tbapi.get_token()
+
+        for encoding_label, accept_encoding in (("uncompressed", "identity"), ("gzipped", ACCEPT_ENCODING)):
+            tbapi.session.headers["Accept-Encoding"] = accept_encoding
+            server.bytes_sent = 0
+            seconds = timed(lambda: tbapi.get("/api/dashboard/x", "Error"))
+            report(encoding_label, seconds, server.bytes_sent // (CALLS + 1))
+
+        tbapi.close()
+
+
+def main():
+    dashboard = dashboard_json(400)
+    telemetry = telemetry_json(20_000)
+
+    print(f"{CALLS} calls each; sizes are per call")
+    bench_upload("Dashboard.update()-sized POST, 400 widgets", "/api/dashboard", dashboard)
+    bench_upload("Telemetry POST, 20,000 points", "/api/v1/token/telemetry", telemetry)
+    bench_download("Dashboard GET, 400 widgets", dashboard)
+
+
+if __name__ == "__main__":
+    main()
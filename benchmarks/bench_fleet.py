@@ -0,0 +1,55 @@
+"""
+Times pulling a day of telemetry for a fleet of devices with TbApi.get_fleet_telemetry(), against a local stand-in
+server that takes LATENCY to answer each request, like a real server across a network.  A loop fetching one device
+after another spends nearly all its time waiting on those round trips; running several devices at once overlaps them.
+
+The one-at-a-time loop is timed on a sample of the fleet and scaled up, since running it on all of them would take minutes.
+
+Run from the repo root with:  python -m benchmarks.bench_fleet
+"""
+
+import time
+
+from thingsboard_api_tools.TbApi import TbApi
+from thingsboard_api_tools.Device import get_telemetry_chunked
+from benchmarks.stand_in_server import StandInServer
+
+
+DEVICES = 2000
+SAMPLE = 100            # Devices fetched one at a time, to estimate what a plain loop would take
+LATENCY = 0.05          # Seconds per request; a nearby server under light load
+POINTS = 1440           # One reading a minute, for a day
+
+START = 1_700_000_000_000
+END = START + 86_400_000
+
+
+def main():
+    payload = {"temperature": [{"ts": START + i * 60_000, "value": 20 + i % 7} for i in reversed(range(POINTS))]}
+    guids = [f"device-{i}" for i in range(DEVICES)]
+
+    with StandInServer(get_payload=payload, latency=LATENCY) as server:
+        tbapi = TbApi(server.url, "user", "password", pool_maxsize=32)
+        tbapi.get_token()
+
+        start = time.perf_counter()
+        for guid in guids[:SAMPLE]:
+            get_telemetry_chunked(tbapi, guid, "temperature", START, END)
+        loop_seconds = (time.perf_counter() - start) * DEVICES / SAMPLE
+
+        print(f"{DEVICES} devices, {POINTS} points each, {LATENCY * 1000:.0f} ms per request")
+        print(f"  one at a time      {loop_seconds:7.1f} s  (projected from {SAMPLE} devices)")
+
+        for concurrency in (8, 16, 32):
+            start = time.perf_counter()
+            fleet = tbapi.get_fleet_telemetry(guids, "temperature", START, END, concurrency=concurrency)
+            seconds = time.perf_counter() - start
+
+            assert len(fleet) == DEVICES and all(len(tel["temperature"]) == POINTS for tel in fleet.values())
+            print(f"  concurrency {concurrency:<6} {seconds:7.1f} s  ({loop_seconds / seconds:.1f}x)")
+
+        tbapi.close()
+
+
+if __name__ == "__main__":
+    main()
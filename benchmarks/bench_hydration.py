@@ -0,0 +1,116 @@
+"""
+Compares how many objects per second can be built from server json for a few of our models: the old way (copy each
+dict, then validate it on its own) versus tb_objects_from_list(), which tags the dicts in place and validates the whole
+list in one call.  No server is needed; the json is synthetic but shaped like what Thingsboard sends.
+
+Run from the repo root with:  python -m benchmarks.bench_hydration
+"""
+
+import random
+import time
+import uuid
+from typing import Any, Callable
+
+from thingsboard_api_tools.TbApi import TbApi
+from thingsboard_api_tools.TbModel import TbObject
+from thingsboard_api_tools.Device import Device
+from thingsboard_api_tools.Customer import Customer
+from thingsboard_api_tools.Dashboard import DashboardHeader
+
+
+RECORDS = 20_000
+ROUNDS = 3
+
+rng = random.Random(0)
+
+
+def make_id(entity_type: str) -> dict[str, str]:
+    return {"id": str(uuid.UUID(int=rng.getrandbits(128))), "entityType": entity_type}
+
+
+def device_json(i: int) -> dict[str, Any]:
+    return {
+        "id": make_id("DEVICE"),
+        "createdTime": 1_600_000_000_000 + i,
+        "tenantId": make_id("TENANT"),
+        "customerId": make_id("CUSTOMER"),
+        "name": f"Device {i}",
+        "type": "default",
+        "label": None,
+        "deviceProfileId": make_id("DEVICE_PROFILE"),
+        "deviceProfileName": "default",
+        "additionalInfo": {"gateway": False, "description": ""},
+        "deviceData": {"configuration": {"type": "DEFAULT"}, "transportConfiguration": {"type": "DEFAULT"}},
+        "firmwareId": None,
+        "softwareId": None,
+        "externalId": None,
+        "customerTitle": "Customer",
+        "customerIsPublic": False,
+        "active": i % 2 == 0,
+    }
+
+
+def customer_json(i: int) -> dict[str, Any]:
+    return {
+        "id": make_id("CUSTOMER"),
+        "createdTime": 1_600_000_000_000 + i,
+        "tenantId": make_id("TENANT"),
+        "title": f"Customer {i}",
+        "name": f"Customer {i}",
+        "address": "1 Main St",
+        "address2": None,
+        "city": "Portland",
+        "state": "OR",
+        "zip": "97201",
+        "country": "US",
+        "email": f"customer{i}@example.com",
+        "phone": None,
+        "additionalInfo": {"isPublic": False, "description": ""},
+    }
+
+
+def dashboard_header_json(i: int) -> dict[str, Any]:
+    return {
+        "id": make_id("DASHBOARD"),
+        "createdTime": 1_600_000_000_000 + i,
+        "tenantId": make_id("TENANT"),
+        "title": f"Dashboard {i}",
+        "name": f"Dashboard {i}",
+        "image": None,
+        "mobileHide": False,
+        "mobileOrder": None,
+        "assignedCustomers": [{"customerId": make_id("CUSTOMER"), "title": "Customer", "public": False}],
+        "externalId": None,
+    }
+
+
+def objects_per_second(build: Callable[[list[dict[str, Any]]], list[Any]], records: list[dict[str, Any]]) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        json_list = [dict(record) for record in records]        # Fresh dicts each round, as if just off the wire
+        start = time.perf_counter()
+        build(json_list)
+        best = min(best, time.perf_counter() - start)
+    return len(records) / best
+
+
+def main():
+    tbapi = TbApi("http://localhost", "user", "password")
+
+    def validate_each(object_type: type[TbObject]):
+        return lambda json_list: [object_type.model_validate(jsn | {"tbapi": tbapi}) for jsn in json_list]
+
+    def batch(object_type: type[TbObject]):
+        return lambda json_list: tbapi.tb_objects_from_list(json_list, object_type)
+
+    print(f"Objects per second building {RECORDS} objects (best of {ROUNDS})")
+    print(f"{'':<18}{'validate each':>16}{'batch':>16}")
+
+    for object_type, make_json in ((Device, device_json), (Customer, customer_json), (DashboardHeader, dashboard_header_json)):
+        records = [make_json(i) for i in range(RECORDS)]
+        rates = [objects_per_second(mode(object_type), records) for mode in (validate_each, batch)]
+        print(f"{object_type.__name__:<18}" + "".join(f"{rate:>16,.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
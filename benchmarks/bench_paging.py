@@ -0,0 +1,54 @@
+"""
+Compares a fixed page size with adaptive page sizing when listing a large tenant from a local stand-in server.
+
+Run from the repo root with:  python -m benchmarks.bench_paging
+"""
+
+import time
+
+from thingsboard_api_tools.TbApi import TbApi
+from thingsboard_api_tools.PageSizer import AdaptivePageSizer
+from benchmarks.stand_in_server import StandInServer
+
+
+RECORDS = 60_000
+
+
+def run(tbapi: TbApi, label: str):
+    pages = 0
+    get_raw = tbapi.get_raw
+
+    def counting_get_raw(params: str, msg: str) -> bytes:
+        nonlocal pages
+        pages += 1
+        return get_raw(params, msg)
+
+    tbapi.get_raw = counting_get_raw       # type: ignore
+
+    start = time.perf_counter()
+    data = tbapi.get_paged("/api/tenant/deviceInfos", "Error")
+    elapsed = time.perf_counter() - start
+
+    tbapi.get_raw = get_raw                # type: ignore
+
+    assert len(data) == RECORDS
+    print(f"{label:<34} {pages:5} requests    {elapsed:6.2f} s")
+
+
+def main():
+    records = [{"id": {"id": f"{i:08}", "entityType": "DEVICE"}, "name": f"Device {i}"} for i in range(RECORDS)]
+
+    with StandInServer(records=records) as server:
+        tbapi = TbApi(server.url, "user", "password")
+        tbapi.get_token()
+
+        print(f"Listing {RECORDS} devices from {server.url}")
+        run(tbapi, "Fixed page size (100)")
+
+        tbapi.adaptive_paging = AdaptivePageSizer()
+        run(tbapi, "Adaptive, first listing")
+        run(tbapi, "Adaptive, sizes already learned")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Checks that a RateLimiter shared by two TbApis keeps many threads at, but not over, a Thingsboard-style limit, against a
+local stand-in server.  It reports the achieved rate, and replays the send times through buckets like the server's to
+count how many requests a real server would have refused.
+
+Run from the repo root with:  python -m benchmarks.bench_rate_limit
+"""
+
+import threading
+import time
+from typing import Any
+
+from thingsboard_api_tools.TbApi import TbApi
+from thingsboard_api_tools.RateLimiter import RateLimiter, EndpointClass, parse_limits
+from benchmarks.stand_in_server import StandInServer
+
+
+LIMITS = "50:1,400:10"
+THREADS = 16
+SECONDS = 12
+
+
+def refused(sent: list[float], capacity: int, period: float) -> int:
+    """ How many of these requests a server enforcing capacity per period (a full token bucket at the start) would refuse """
+    tokens, rate, last, refusals = float(capacity), capacity / period, sent[0], 0
+
+    for now in sent:
+        tokens = min(capacity, tokens + (now - last) * rate)
+        last = now
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            refusals += 1
+
+    return refusals
+
+
+def main():
+    with StandInServer() as server:
+        limiter = RateLimiter({EndpointClass.ALL: LIMITS})
+        tbapis = [TbApi(server.url, "user", "password", pool_maxsize=THREADS) for _ in range(2)]
+        sent: list[float] = []
+
+        for tbapi in tbapis:
+            tbapi.get_token()
+            tbapi.rate_limiter = limiter
+            request = tbapi.session.request
+
+            def stamped(*args: Any, request=request, **kwargs: Any):
+                sent.append(time.monotonic())      # list.append is atomic, so no lock needed
+                return request(*args, **kwargs)
+
+            tbapi.session.request = stamped       # type: ignore
+
+        deadline = time.monotonic() + SECONDS
+
+        def worker(tbapi: TbApi):
+            while time.monotonic() < deadline:
+                tbapi.get("/api/customers", "Error")
+
+        threads = [threading.Thread(target=worker, args=(tbapis[i % 2],)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sent.sort()
+        elapsed = sent[-1] - sent[0]
+        print(f"{len(sent)} GETs from {THREADS} threads over {elapsed:.1f} s with limits {LIMITS}: {len(sent) / elapsed:.1f}/s")
+        for capacity, period in parse_limits(LIMITS):
+            print(f"  limit {capacity:>4} per {period:g} s: {refused(sent, capacity, period)} would have been refused")
+        print(f"  held back by the limiter: {sum(tbapi.stats['rate_limited'] for tbapi in tbapis)}")
+
+        for tbapi in tbapis:
+            tbapi.close()
+
+
+if __name__ == "__main__":
+    main()
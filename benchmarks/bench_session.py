@@ -0,0 +1,61 @@
+"""
+Compares per-call latency of one-off connections (what TbApi did before it owned a pooled session) with TbApi's pooled
+keep-alive session, against a local stand-in server.
+
+Run from the repo root with:  python -m benchmarks.bench_session
+"""
+
+import statistics
+import time
+
+import requests
+
+from thingsboard_api_tools.TbApi import TbApi
+from benchmarks.stand_in_server import StandInServer
+
+
+CALLS = 2000
+
+
+def time_calls(func, calls: int) -> list[float]:
+    timings: list[float] = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    mean_us = statistics.mean(timings) * 1_000_000
+    p95_us = sorted(timings)[int(len(timings) * 0.95)] * 1_000_000
+    print(f"{label:<28} mean {mean_us:8.1f} us    p95 {p95_us:8.1f} us    total {sum(timings):6.2f} s")
+
+
+def main():
+    with StandInServer() as server:
+        tbapi = TbApi(server.url, "user", "password")
+        headers = {"Accept": "application/json"}
+        tbapi.add_auth_header(headers)
+
+        url = server.url + "/api/customers"
+
+        def unpooled():
+            requests.get(url, headers=headers).json()
+
+        def pooled():
+            tbapi.get("/api/customers", "Error")
+
+        # Warm up both paths so we're not timing imports or first-connection setup
+        time_calls(unpooled, 50)
+        time_calls(pooled, 50)
+
+        print(f"{CALLS} GETs against {server.url}")
+        report("New connection per call", time_calls(unpooled, CALLS))
+        report("Pooled keep-alive session", time_calls(pooled, CALLS))
+
+        tbapi.close()
+
+
+if __name__ == "__main__":
+    main()
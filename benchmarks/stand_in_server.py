@@ -0,0 +1,124 @@
+"""
+A tiny local stand-in for a Thingsboard server, used by the benchmarks in this directory.  It only knows enough of the
+API to keep TbApi happy: logging in, and answering GETs with canned json.  It is not a test fixture and doesn't
+pretend to be complete.
+"""
+
+import gzip
+import json as Json
+import math
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # Required for keep-alive
+    disable_nagle_algorithm = True      # Otherwise delayed ACKs dominate timings on reused connections
+
+    server: "StandInServer"
+
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        self.server.bytes_received += length
+
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        Json.loads(body or b"null")      # Parse it, as a real server would
+
+        if self.path.startswith("/api/auth/"):
+            self._send_json({"token": "stand-in-token", "refreshToken": "stand-in-refresh-token"})
+        else:
+            self._send_json({})
+
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        query = parse_qs(urlparse(self.path).query)
+
+        if self.server.records is not None and "page" in query:
+            self._send_json(self._page(int(query["page"][0]), int(query["pageSize"][0])))
+        else:
+            self._send_json(self.server.get_payload)
+
+
+    def _page(self, page: int, page_size: int) -> dict[str, Any]:
+        records = self.server.records
+        assert records is not None
+
+        return {
+            "data": records[page * page_size:(page + 1) * page_size],
+            "totalPages": math.ceil(len(records) / page_size),
+            "totalElements": len(records),
+            "hasNext": (page + 1) * page_size < len(records),
+        }
+
+
+    def do_DELETE(self):
+        self._send_json({})
+
+
+    def _send_json(self, payload: Any):
+        body = Json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+
+        if self.server.compress_responses and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+
+        self.server.bytes_sent += len(body)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format: str, *args: Any):
+        pass        # Keep benchmark output clean
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        get_payload: Any = None,
+        records: list[Any] | None = None,
+        compress_responses: bool = False,
+        latency: float = 0,
+    ):
+        """
+        get_payload: Returned for every GET
+        records: If provided, GETs with page and pageSize params are answered with the matching page of these instead
+        compress_responses: Gzip responses for clients that accept it
+        latency: Seconds to wait before answering each GET, standing in for network round trips and server work
+        """
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.get_payload = get_payload if get_payload is not None else {"data": [], "hasNext": False}
+        self.records = records
+        self.compress_responses = compress_responses
+        self.latency = latency
+
+        self.bytes_received = 0     # Request and response body sizes, as sent over the wire
+        self.bytes_sent = 0
+
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+    def __enter__(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None) -> None:
+        self.shutdown()
+        self.server_close()
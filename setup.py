@@ -15,6 +15,9 @@ setup(
     install_requires=[
         "requests",  # Add other dependencies here
     ],
+    extras_require={
+        "numpy": ["numpy"],     # For Device.get_telemetry_columns() and TelemetryColumns.to_columns()
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
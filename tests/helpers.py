@@ -1,21 +1,24 @@
 import os
 from dotenv import load_dotenv
 from typing import Any
+import copy
 import json
+import operator
+import random
+import uuid
 
-from thingsboard_api_tools.TbApi import TbApi
+from thingsboard_api_tools.TbApi import TbApi, SortOrder, SortClause, _parse_sort_clause
+from thingsboard_api_tools.Customer import Customer
+from thingsboard_api_tools.AsyncTbApi import AsyncTbApi
 
 load_dotenv()
 
 
-def get_tbapi_from_env(verbose: bool = False) -> TbApi:
+def get_credentials_from_env() -> tuple[str, str, str]:
     """
-    Create a TbApi instance using environment variables for configuration.
-
     Expects MOTHERSHIP_URL, THINGSBOARD_USERNAME, and THINGSBOARD_PASSWORD to be set or be included
     in a .env file.
     """
-
     mothership_url = os.getenv("MOTHERSHIP_URL")
     thingsboard_username = os.getenv("THINGSBOARD_USERNAME")
     thingsboard_password = os.getenv("THINGSBOARD_PASSWORD")
@@ -23,6 +26,15 @@ def get_tbapi_from_env(verbose: bool = False) -> TbApi:
     msg = "MOTHERSHIP_URL, THINGSBOARD_USERNAME, and THINGSBOARD_PASSWORD environment variables must be set to run these tests -- put them in a .env file in the repo root for convenience."
     assert mothership_url and thingsboard_username and thingsboard_password, msg
 
+    return mothership_url, thingsboard_username, thingsboard_password
+
+
+def get_tbapi_from_env(verbose: bool = False) -> TbApi:
+    """
+    Create a TbApi instance using environment variables for configuration.
+    """
+    mothership_url, thingsboard_username, thingsboard_password = get_credentials_from_env()
+
     tbapi = TbApi(url=mothership_url, username=thingsboard_username, password=thingsboard_password)
 
     if verbose:
@@ -31,6 +43,20 @@ def get_tbapi_from_env(verbose: bool = False) -> TbApi:
     return tbapi
 
 
+def get_async_tbapi_from_env(verbose: bool = False) -> AsyncTbApi:
+    """
+    Create an AsyncTbApi instance using the same environment variables as get_tbapi_from_env().
+    """
+    mothership_url, thingsboard_username, thingsboard_password = get_credentials_from_env()
+
+    atbapi = AsyncTbApi(url=mothership_url, username=thingsboard_username, password=thingsboard_password)
+
+    if verbose:
+        atbapi.verbose = True
+
+    return atbapi
+
+
 def mock_get_paged_customers(self: TbApi, params: str, msg: str) -> list[dict[str, Any]]:
     """
     Mock function to simulate TbApi.get_paged for customers with fixed data from file.  Much faster than the real deal.
@@ -38,3 +64,53 @@ def mock_get_paged_customers(self: TbApi, params: str, msg: str) -> list[dict[st
     with open("tests/data/customers_unsorted.json", "r", encoding="utf-8") as filex:
         data = json.load(filex)
         return data
+
+
+# Sort clauses exercising None-last, bools, Ids, and mixed directions
+MULTISORT_CASES: list[SortClause] = [
+    "name",
+    "zip desc",
+    [("phone", SortOrder.ASC), ("email", SortOrder.DESC)],
+    [("phone", SortOrder.DESC), ("email", SortOrder.ASC), ("city", SortOrder.DESC)],
+    ["tenant_id", "id"],
+    [("city", SortOrder.DESC), ("id", SortOrder.DESC)],
+    ["city", "zip", "phone"],
+]
+
+
+def scaled_customers(tbapi: TbApi, copies: int) -> list[Customer]:
+    """ Make copies of the customers in our fixture, varying the fields we sort on so there aren't just 33 distinct values. """
+    with open("tests/data/customers_unsorted.json", "r", encoding="utf-8") as filex:
+        data = json.load(filex)
+
+    rng = random.Random(0)
+    records: list[dict[str, Any]] = []
+
+    for i in range(copies):
+        for record in data:
+            record = copy.deepcopy(record)
+            record["id"]["id"] = str(uuid.UUID(int=rng.getrandbits(128)))
+            record["title"] = f"{record['title']} {i}"
+            record["zip"] = f"{rng.randrange(100000):05}"
+            record["phone"] = None if rng.random() < 0.2 else f"555-{rng.randrange(10000):04}"
+            records.append(record)
+
+    return tbapi.tb_objects_from_list(records, Customer)
+
+
+def multi_pass_sort(lst: list[Customer], sorting: SortClause) -> list[Customer]:
+    """ The previous implementation of _multisort, kept as a reference: one stable sort per field, last field first. """
+    def key_func(attr: str):
+        getter = operator.attrgetter(attr)
+
+        def key(item: Customer) -> tuple[bool, Any | None]:
+            value = getter(item)
+            if isinstance(value, bool):
+                return (False, not value)
+            return (value is None, value)
+        return key
+
+    for attr, reverse in reversed(_parse_sort_clause(sorting)):
+        lst.sort(key=key_func(attr), reverse=reverse)
+
+    return lst
@@ -0,0 +1,70 @@
+import asyncio
+
+from thingsboard_api_tools.TbModel import Attributes
+from tests.helpers import get_tbapi_from_env, get_async_tbapi_from_env
+
+
+tbapi = get_tbapi_from_env()
+
+
+def test_async_listings_match_sync():
+    """ The async client should return the same objects as the blocking one. """
+    async def run():
+        async with get_async_tbapi_from_env() as atbapi:
+            return await asyncio.gather(atbapi.get_all_devices(sort_by="name"), atbapi.get_all_customers(sort_by="name"))
+
+    devices, customers = asyncio.run(run())
+
+    assert [d.id for d in devices] == [d.id for d in tbapi.get_all_devices(sort_by="name")]
+    assert customers == tbapi.get_all_customers(sort_by="name")
+
+
+def test_async_lookups_by_id():
+    device = tbapi.get_all_devices()[0]
+
+    async def run():
+        async with get_async_tbapi_from_env() as atbapi:
+            return await atbapi.get_device_by_id(device.id), await atbapi.get_device_profile_by_id(device.device_profile_id)
+
+    dev, profile = asyncio.run(run())
+
+    assert dev.id == device.id
+    assert profile.id == device.device_profile_id
+
+    # Objects we get back should still be usable with their regular, blocking methods
+    assert dev.get_profile() == profile
+
+
+def test_async_fan_out_over_devices():
+    """ Fetch telemetry keys and attributes for every device at once; results should match the blocking calls. """
+    devices = tbapi.get_all_devices()[:20]
+
+    async def run():
+        async with get_async_tbapi_from_env() as atbapi:
+            keys = await asyncio.gather(*[atbapi.get_telemetry_keys(d) for d in devices])
+            attrs = await asyncio.gather(*[atbapi.get_attributes(d, Attributes.Scope.SERVER) for d in devices])
+            return keys, attrs
+
+    keys, attrs = asyncio.run(run())
+
+    for device, device_keys, device_attrs in zip(devices, keys, attrs):
+        assert sorted(device_keys) == sorted(device.get_telemetry_keys())
+        assert device_attrs.as_dict().keys() == device.get_server_attributes().as_dict().keys()
+
+
+def test_async_lookups_by_name():
+    """ Name lookups should find the same objects with or without the shared name_index. """
+    from thingsboard_api_tools.NameIndex import NameIndex
+
+    device = tbapi.get_all_devices()[0]
+    customer = tbapi.get_all_customers()[0]
+
+    async def run(use_index: bool):
+        async with get_async_tbapi_from_env() as atbapi:
+            atbapi.tbapi.name_index = NameIndex() if use_index else None
+            return await atbapi.get_device_by_name(device.name), await atbapi.get_customer_by_name(customer.name)
+
+    for use_index in (False, True):
+        dev, cust = asyncio.run(run(use_index))
+        assert dev is not None and dev.id == device.id
+        assert cust == customer
@@ -25,6 +25,13 @@ def test_customer_sort():
     assert lst_1 == list(reversed(lst_2))
 
 
+def test_get_customers_by_ids():
+    customers = tbapi.get_all_customers()
+    ids = [c.id for c in customers]
+
+    assert tbapi.get_customers_by_ids(ids + [str(uuid.uuid4())] + ids[:1]) == customers + [None] + customers[:1]
+
+
 def test_customer_id():
     """ There's something goofy in the code here; make sure that customer_id passes smoke test. """
     cust = tbapi.get_all_customers()[0]
@@ -182,5 +189,15 @@ def test_get_devices():
     assert cust.delete()
 
 
+def test_iter_devices():
+    """ The generator version should produce the same devices as the list version. """
+    for cust in tbapi.get_all_customers()[:5]:
+        assert [d.id for d in cust.iter_devices()] == [d.id for d in cust.get_devices()]
+
+
+def test_iter_all_customers():
+    assert list(tbapi.iter_all_customers()) == tbapi.get_all_customers()
+
+
 def fake_cust_name():
     return "__TEST_CUST__ " + fake.name()
@@ -1,5 +1,6 @@
 from faker import Faker
 
+from thingsboard_api_tools.TbApi import TbApi
 from tests.helpers import get_tbapi_from_env
 
 
@@ -26,6 +27,13 @@ def test_get_dashboard_by_id():
     assert dash == dashboard
 
 
+def test_get_dashboard_headers_by_ids():
+    dashboards = tbapi.get_all_dashboard_headers()[:5]
+    ids = [d.id for d in dashboards]
+
+    assert tbapi.get_dashboard_headers_by_ids(ids + [TbApi.NULL_GUID] + ids[:1]) == dashboards + [None] + dashboards[:1]
+
+
 def test_get_dashboard_by_name():
     dashboard_header = tbapi.get_all_dashboard_headers()[0]
     assert dashboard_header
@@ -21,6 +21,13 @@ def test_device_sort():
     assert lst_1 == list(reversed(lst_2))
 
 
+def test_get_devices_by_ids():
+    devices = tbapi.get_all_devices()[:5]
+    ids = [d.id for d in devices]
+
+    assert tbapi.get_devices_by_ids(ids + [TbApi.NULL_GUID] + ids[:1]) == devices + [None] + devices[:1]
+
+
 def test_create_device():
     """
     Tests creating a device without specifying a customer
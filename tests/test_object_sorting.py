@@ -1,6 +1,8 @@
 from typing import Any
+import itertools
+import random
 
-from thingsboard_api_tools.TbApi import SortOrder
+from thingsboard_api_tools.TbApi import SortOrder, SortClause, _multisort
 import tests.helpers as helpers
 
 
@@ -114,6 +116,49 @@ def test_sorting_device_by_active_status():
     assert active == sorted(active, reverse=True)    # Python sorts bools with False before True by default, so reverse it
 
 
+def test_multisort_matches_multi_pass_sort():
+    """ The single-pass composite-key sort must produce exactly the order the old one-pass-per-field sort did. """
+    customers = helpers.scaled_customers(tbapi, copies=20)
+
+    for sorting in helpers.MULTISORT_CASES:
+        random.shuffle(customers)
+        expected = helpers.multi_pass_sort(list(customers), sorting)
+        actual = _multisort(list(customers), sorting)
+
+        assert [id(c) for c in actual] == [id(c) for c in expected], sorting
+
+
 def sort(unsorted: list[tuple[Any | None, ...]], index: int, reverse: bool):
     """ Not easy to use, but only needed here, for testing. """
     return sorted(unsorted, key=lambda x: ((x[index] is None, x[index])), reverse=reverse)
+
+
+def test_server_side_sorting():
+    """
+    Streaming listings are sorted by the server; they should agree with our client-side sort on fields where the two
+    can't differ (created_time is an int, so collation doesn't come into it).
+    """
+    for sort_by in ("created_time", "created_time desc"):
+        streamed = [d.id for d in tbapi.iter_all_devices(sort_by=sort_by)]
+        assert streamed == [d.id for d in tbapi.get_all_devices(sort_by=sort_by)]
+
+        streamed = [c.id for c in tbapi.iter_all_customers(sort_by=sort_by)]
+        assert streamed == [c.id for c in tbapi.get_all_customers(sort_by=sort_by)]
+
+
+def test_server_side_top_n():
+    """ Server sorting lets us stop after the first few results without downloading everything. """
+    newest = list(itertools.islice(tbapi.iter_all_devices(sort_by=[("created_time", SortOrder.DESC)]), 3))
+    assert [d.id for d in newest] == [d.id for d in tbapi.get_all_devices(sort_by=[("created_time", SortOrder.DESC)])[:3]]
+
+
+def test_streaming_sort_requires_server_field():
+    """ Streaming can't fall back to client-side sorting, so asking for an unsupported field should fail up front. """
+    unsupported: list[SortClause] = ["id", ["name", "created_time"]]
+    for sort_by in unsupported:
+        try:
+            tbapi.iter_all_devices(sort_by=sort_by)
+        except ValueError:
+            pass
+        else:
+            assert False
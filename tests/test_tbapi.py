@@ -0,0 +1,516 @@
+from typing import Any
+import pytest
+
+from tests.helpers import get_tbapi_from_env
+
+
+tbapi = get_tbapi_from_env()
+
+
+def test_models_share_pooled_session():
+    """ Every model should route its calls through the TbApi's pooled session rather than opening its own connections. """
+    devices = tbapi.get_all_devices()
+    customers = tbapi.get_all_customers()
+
+    for obj in devices + customers:
+        assert obj.tbapi.session is tbapi.session
+
+
+def test_close_leaves_tbapi_usable():
+    """ Closing drops pooled connections, but later calls should simply open new ones. """
+    tbapi.get_all_customers()
+    tbapi.close()
+    tbapi.get_all_customers()
+
+
+def test_concurrent_paging_preserves_order():
+    """ Fetching pages in parallel should give exactly the same results, in the same order, as walking them one by one. """
+    sequential = tbapi.get_paged("/api/tenant/deviceInfos", "Error", concurrency=1)
+    parallel = tbapi.get_paged("/api/tenant/deviceInfos", "Error", concurrency=8)
+
+    assert [d["id"]["id"] for d in parallel] == [d["id"]["id"] for d in sequential]
+
+
+def test_paging_concurrency_setting():
+    tbapi.paging_concurrency = 4
+    try:
+        devices = tbapi.get_all_devices(sort_by="name")
+    finally:
+        tbapi.paging_concurrency = 1
+
+    assert [d.id for d in devices] == [d.id for d in tbapi.get_all_devices(sort_by="name")]
+
+
+def test_iter_listings_match_lists():
+    """ Generator versions of the list methods should yield the same objects, in the same order. """
+    assert [d.id for d in tbapi.iter_all_devices()] == [d.id for d in tbapi.get_all_devices()]
+    assert [d.id for d in tbapi.iter_all_devices(is_active=True)] == [d.id for d in tbapi.get_all_devices(is_active=True)]
+    assert [d.id for d in tbapi.iter_all_dashboard_headers()] == [d.id for d in tbapi.get_all_dashboard_headers()]
+    assert list(tbapi.iter_tenant_assets()) == tbapi.get_tenant_assets()
+
+
+def test_iter_can_stop_early():
+    """ Abandoning a generator partway through shouldn't hang or raise. """
+    devices = tbapi.iter_all_devices()
+    first = next(devices, None)
+    devices.close()
+
+    if first:
+        assert first.id == tbapi.get_all_devices()[0].id
+
+
+def test_page_sizes():
+    """ Page size shouldn't change what we get back, whether set per call, per endpoint, or adaptively. """
+    expected = [d["id"]["id"] for d in tbapi.get_paged("/api/tenant/deviceInfos", "Error")]
+
+    assert [d["id"]["id"] for d in tbapi.get_paged("/api/tenant/deviceInfos", "Error", page_size=3)] == expected
+
+    tbapi.page_sizes = {"/api/tenant/device": 7}
+    try:
+        assert [d["id"]["id"] for d in tbapi.get_paged("/api/tenant/deviceInfos", "Error")] == expected
+    finally:
+        tbapi.page_sizes = {}
+
+
+def test_adaptive_page_size():
+    """ A cheap endpoint should get bigger pages over time, and the listing should be unchanged as sizes shift. """
+    from thingsboard_api_tools.PageSizer import AdaptivePageSizer
+
+    expected = [d["id"]["id"] for d in tbapi.get_paged("/api/tenant/deviceInfos", "Error")]
+
+    tbapi.adaptive_paging = AdaptivePageSizer(min_page_size=1, target_seconds=60)
+    tbapi.default_page_size = 2
+    try:
+        for _ in range(3):
+            assert [d["id"]["id"] for d in tbapi.get_paged("/api/tenant/deviceInfos", "Error")] == expected
+            assert [d["id"]["id"] for page in tbapi.iter_paged("/api/tenant/deviceInfos", "Error") for d in page] == expected
+
+        if len(expected) > 4:
+            assert tbapi.adaptive_paging.page_size("/api/tenant/deviceInfos", 2) > 2
+    finally:
+        tbapi.adaptive_paging = None
+        tbapi.default_page_size = 100
+
+
+def test_entity_cache():
+    """ With a cache attached, repeat lookups by id return the same instance until it's invalidated or updated. """
+    from thingsboard_api_tools.EntityCache import EntityCache
+
+    cust_id = tbapi.get_all_customers()[0].id
+
+    tbapi.entity_cache = EntityCache(max_size=2)
+    try:
+        cust = tbapi.get_customer_by_id(cust_id)
+        assert tbapi.get_customer_by_id(cust_id) is cust
+        assert tbapi.entity_cache.hits == 1
+
+        tbapi.invalidate_cached(cust_id)
+        refetched = tbapi.get_customer_by_id(cust_id)
+        assert refetched is not cust and refetched == cust
+
+        refetched.update()
+        assert tbapi.get_customer_by_id(cust_id) is not refetched
+
+        tbapi.entity_cache.ttls = {"Customer": 0}
+        tbapi.entity_cache.clear()
+        assert tbapi.get_customer_by_id(cust_id) is not tbapi.get_customer_by_id(cust_id)
+    finally:
+        tbapi.entity_cache = None
+
+
+def test_name_index():
+    """ Names resolved through the index should match what the server query finds, including for new devices. """
+    from thingsboard_api_tools.NameIndex import NameIndex
+
+    devices = tbapi.get_all_devices()
+    customers = tbapi.get_all_customers()
+
+    tbapi.name_index = NameIndex(max_age=0)
+    try:
+        for device in devices:
+            assert tbapi.get_device_by_name(device.name) == device
+        for customer in customers:
+            assert tbapi.get_customer_by_name(customer.name) == customer
+        assert tbapi.get_device_by_name("no such device, surely") is None
+
+        profile = tbapi.get_all_device_profiles()[0]
+        assert tbapi.get_device_profile_by_name(profile.name).id == profile.id
+    finally:
+        tbapi.name_index = None
+
+
+def test_name_index_refresh():
+    """ Duplicate names should raise as server lookups do, and refreshes should fetch only the pages they read. """
+    from types import SimpleNamespace
+    from thingsboard_api_tools.NameIndex import NameIndex
+    from thingsboard_api_tools.TbApi import TbApi
+
+    def obj(guid: str, name: str, created_time: int):
+        return SimpleNamespace(id=SimpleNamespace(id=guid), name=name, created_time=created_time)
+
+    listing = [obj("c", "twin", 3), obj("b", "twin", 2), obj("a", "solo", 1)]
+    index = NameIndex(max_age=0)
+
+    assert index.lookup(SimpleNamespace, "solo", lambda: listing) is listing[2]
+    with pytest.raises(Exception):
+        index.lookup(SimpleNamespace, "twin", lambda: listing)
+    index.forget("b")
+    assert index.lookup(SimpleNamespace, "twin", lambda: listing) is listing[0]       # Once one is deleted, no longer ambiguous
+
+    pager = TbApi("http://localhost", "user", "password")
+    pages: list[int] = []
+
+    def get_page(params: str, msg: str, page: int, page_size: int) -> dict[str, Any]:
+        pages.append(page)
+        return {"data": [page], "hasNext": True}
+
+    pager._get_page = get_page      # type: ignore
+    assert next(pager.iter_paged("/api/customers", "Error", prefetch=False)) == [0]
+    assert pages == [0]
+
+
+def test_entity_data_query():
+    """ One paged query should find the same devices as a listing, with the fields we asked for. """
+    from thingsboard_api_tools.EntityDataQuery import EntityDataQuery
+
+    devices = tbapi.get_all_devices(sort_by="name")
+    query = EntityDataQuery.devices().with_fields("name", "type").order_by("name").with_page_size(2)
+
+    records = list(tbapi.query_entities(query))
+
+    assert [r.entity_id for r in records] == [d.id for d in devices]
+    assert [r.fields["name"] for r in records] == [d.name for d in devices]
+    assert tbapi.count_entities(query) == len(devices)
+
+    if devices:
+        named = EntityDataQuery.devices().with_fields("name").where("name", "EQUAL", devices[0].name)
+        assert [r.entity_id for r in tbapi.query_entities(named)] == [devices[0].id]
+
+
+def test_token_renewal_is_single_flight():
+    """ When the token expires under heavy concurrent use, exactly one thread renews it, via the refresh token. """
+    import threading
+    from tests.helpers import get_credentials_from_env
+    from thingsboard_api_tools.TbApi import TbApi
+
+    fresh = TbApi(*get_credentials_from_env(), pool_maxsize=32)
+
+    endpoints: list[str] = []
+    request_token = fresh._request_token
+
+    def counting_request_token(endpoint: str, body: dict[str, str]):
+        endpoints.append(endpoint)
+        return request_token(endpoint, body)
+
+    fresh._request_token = counting_request_token       # type: ignore
+
+    for expiry in range(1, 4):
+        if fresh.token:
+            fresh._discard_token(fresh.token)     # Expire whatever token we have
+        start = threading.Barrier(32)
+
+        def worker():
+            start.wait()
+            for _ in range(5):
+                fresh.get_current_user()
+
+        threads = [threading.Thread(target=worker) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(endpoints) == expiry
+
+    assert endpoints == ["/api/auth/login", "/api/auth/token", "/api/auth/token"]
+
+
+def test_token_expiry_comes_from_jwt():
+    """ A JWT's lifetime (exp - iat) decides when we renew it; anything else falls back to token_timeout. """
+    import base64
+    import json
+    import time
+    from thingsboard_api_tools.TbApi import TbApi, _token_expiry
+
+    def jwt(claims: dict[str, int]) -> str:
+        payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+        return f"header.{payload}.signature"
+
+    expires = _token_expiry(jwt({"iat": 1_000_000, "exp": 1_009_000}))
+    assert expires is not None and abs(expires - (time.time() + 9000)) < 5
+    assert _token_expiry(jwt({"sub": 1})) is None
+    assert _token_expiry("not a jwt") is None
+
+    # Tokens shorter-lived than token_refresh_margin (60 s) are used for the first half of their lives, not renewed at once
+    short = TbApi("http://localhost", "user", "password")
+    now = time.time()
+    short.token, short.token_time, short.token_expires = "token", now, now + 30
+    assert short.has_valid_token()
+    short.token_time, short.token_expires = now - 20, now + 10
+    assert not short.has_valid_token()
+    short.token_time, short.token_expires = now - 10, now + 3600        # Long-lived tokens keep the full margin
+    assert short.has_valid_token()
+    short.token_time, short.token_expires = now - 3000, now + 50
+    assert not short.has_valid_token()
+
+
+def test_rejected_token_is_renewed():
+    """ If the server turns down our token, we should log in again and retry rather than fail. """
+    from tests.helpers import get_credentials_from_env
+    from thingsboard_api_tools.TbApi import TbApi
+
+    fresh = TbApi(*get_credentials_from_env())
+    fresh.get_token()
+    fresh.token = "no-longer-any-good"      # Still looks fresh to us
+
+    assert fresh.get_current_user()
+    assert fresh.token != "no-longer-any-good"
+
+
+def scripted_tbapi(outcomes: list[int | Exception]):
+    """
+    A TbApi that already has a token and whose session replays outcomes (status codes or exceptions to raise) instead
+    of talking to a server.  Returns the TbApi and the list of methods it sent.
+    """
+    import time
+    import requests
+    from thingsboard_api_tools.TbApi import TbApi
+
+    fake = TbApi("http://localhost", "user", "password")
+    fake.token, fake.token_time = "token", time.time()
+    sent: list[str] = []
+
+    def request(method: str, url: str, **kwargs: Any) -> requests.Response:
+        sent.append(method)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        response = requests.Response()
+        response.status_code = outcome
+        response.headers["Retry-After"] = "0"
+        response._content = b'{"ok": true}'
+        return response
+
+    fake.session.request = request      # type: ignore
+    return fake, sent
+
+
+def test_retry_policy():
+    """ Routine failures on safe requests should be retried and counted; POSTs only when marked idempotent. """
+    import requests
+    from thingsboard_api_tools.RetryPolicy import RetryPolicy
+
+    fake, sent = scripted_tbapi([503, requests.ConnectionError(), 200])
+    fake.retry_policy = RetryPolicy(backoff=0)
+    assert fake.get("/api/anything", "Error") == {"ok": True}
+    assert len(sent) == 3
+    assert (fake.stats["retries"], fake.stats["retries.503"], fake.stats["retries.ConnectionError"]) == (2, 1, 1)
+
+    fake, sent = scripted_tbapi([503, 200])
+    fake.retry_policy = RetryPolicy(backoff=0)
+    with pytest.raises(requests.HTTPError):
+        fake.post("/api/anything", {}, "Error")
+    assert fake.stats["retries"] == 0
+
+    fake, sent = scripted_tbapi([503, 200])
+    fake.retry_policy = RetryPolicy(backoff=0)
+    assert fake.post("/api/anything", {}, "Error", idempotent=True) == {"ok": True}
+
+    fake, sent = scripted_tbapi([502, 502, 502])
+    fake.retry_policy = RetryPolicy(max_attempts=3, backoff=0)
+    with pytest.raises(requests.HTTPError):
+        fake.get("/api/anything", "Error")
+    assert len(sent) == 3 and fake.stats["gave_up"] == 1
+
+    fake, sent = scripted_tbapi([503])      # No policy: fail right away, as before
+    with pytest.raises(requests.HTTPError):
+        fake.get("/api/anything", "Error")
+
+
+def test_rate_limiter():
+    """ Requests within the burst go straight out; after that they're spaced at the limit, per class and overall. """
+    from thingsboard_api_tools.RateLimiter import RateLimiter, EndpointClass, parse_limits
+
+    assert parse_limits("100:1,2000:60") == [(100, 1.0), (2000, 60.0)]
+    with pytest.raises(ValueError):
+        parse_limits("100")
+
+    now = 0.0
+    limiter = RateLimiter({EndpointClass.ALL: "10:1,12:60", EndpointClass.TELEMETRY_WRITE: "2:1"}, margin=0, clock=lambda: now)
+
+    assert [limiter.reserve(EndpointClass.TELEMETRY_WRITE) for _ in range(4)] == pytest.approx([0, 0, 0.5, 1])
+    assert [limiter.reserve(EndpointClass.ENTITY) for _ in range(7)] == pytest.approx([0] * 6 + [0.1])
+
+    now = 1.0       # The per-second bucket has refilled, but the per-minute one has only 1.2 tokens
+    assert [limiter.reserve(EndpointClass.TELEMETRY_READ) for _ in range(2)] == pytest.approx([0, 4])
+
+    assert RateLimiter.classify("POST", "/api/plugins/telemetry/DEVICE/x/timeseries/ANY") == EndpointClass.TELEMETRY_WRITE
+    assert RateLimiter.classify("GET", "/api/plugins/telemetry/DEVICE/x/values/timeseries") == EndpointClass.TELEMETRY_READ
+    assert RateLimiter.classify("GET", "/api/device/x") == EndpointClass.ENTITY
+
+    fake, sent = scripted_tbapi([200, 200, 200])
+    fake.rate_limiter = RateLimiter({EndpointClass.ALL: "2:0.1"}, margin=0)
+    for _ in range(3):
+        fake.get("/api/anything", "Error")
+    assert fake.stats["rate_limited"] == 1
+
+
+def test_coalesced_gets():
+    """ Identical GETs in flight at once should share one request, but each caller gets its own copy of the result. """
+    import threading
+    import time
+
+    fake, sent = scripted_tbapi([200, 200])
+    fake.coalesce_gets = True
+
+    request = fake.session.request
+    release = threading.Event()
+
+    def slow_request(*args: Any, **kwargs: Any):
+        release.wait()
+        return request(*args, **kwargs)
+
+    fake.session.request = slow_request
+
+    results: list[Any] = []
+    threads = [threading.Thread(target=lambda: results.append(fake.get("/api/customer/x", "Error"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.monotonic() + 5
+    while fake.stats["coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(sent) == 1 and fake.stats["coalesced"] == 7
+    assert results == [{"ok": True}] * 8
+    assert len({id(result) for result in results}) == 8
+
+    fake.get("/api/customer/x", "Error")      # Once the first is done, the next identical GET goes to the server
+    assert len(sent) == 2
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_response_cache(on_disk: bool, tmp_path: Any):
+    """ Matching GETs should be answered from the cache until they expire, are evicted, or a related write happens. """
+    from thingsboard_api_tools.ResponseCache import ResponseCache
+
+    profile_id = "0b5e7a3c-1a2b-11ee-8c99-0242ac120002"
+    path = str(tmp_path / "cache.sqlite") if on_disk else None
+
+    fake, sent = scripted_tbapi([200] * 12)
+    fake.response_cache = ResponseCache({r"/api/deviceProfile": 60, r"/api/asset/types": 0}, max_entries=2, path=path)
+
+    for _ in range(3):
+        assert fake.get(f"/api/deviceProfileInfo/{profile_id}", "Error") == {"ok": True}
+    assert len(sent) == 1
+    assert (fake.response_cache.hits, fake.response_cache.misses) == (2, 1)
+
+    fake.get("/api/asset/types", "Error")           # TTL 0 and unmatched URLs aren't cached
+    fake.get("/api/asset/types", "Error")
+    fake.get("/api/device/x", "Error")
+    assert len(sent) == 4 and len(fake.response_cache) == 1
+
+    fake.get("/api/deviceProfiles?page=0", "Error")
+    fake.get("/api/deviceProfiles?page=1", "Error")   # Evicts the least recently used: the profile info
+    assert len(fake.response_cache) == 2
+    fake.get(f"/api/deviceProfileInfo/{profile_id}", "Error")
+    assert len(sent) == 7
+
+    fake.post("/api/device", {}, "Error")           # Unrelated write; nothing dropped
+    assert len(fake.response_cache) == 2
+    fake.delete(f"/api/deviceProfile/{profile_id}", "Error")
+    assert len(fake.response_cache) == 0
+
+    fake.get("/api/deviceProfiles?page=0", "Error")
+    fake.post(f"/api/plugins/telemetry/DEVICE/{profile_id}/timeseries/ANY", {}, "Error")    # Different id; nothing dropped
+    assert len(fake.response_cache) == 1
+
+    other, other_sent = scripted_tbapi([200])        # Same cache, different login: must not see our entries
+    other.username = "someone else"
+    other.response_cache = fake.response_cache
+    other.get("/api/deviceProfiles?page=0", "Error")
+    assert len(other_sent) == 1 and len(fake.response_cache) == 2
+
+    if on_disk:     # A new cache on the same file picks up where we left off, for the same scope only
+        fake.response_cache.close()
+        reopened = ResponseCache({r"/api/deviceProfile": 60}, path=path)
+        assert reopened.get("/api/deviceProfiles?page=0", fake._cache_scope()) == b'{"ok": true}'
+        assert reopened.get("/api/deviceProfiles?page=0", "user@http://elsewhere") is None
+        reopened.invalidate_for_write("/api/deviceProfile", fake._cache_scope())
+        assert len(reopened) == 1
+
+
+def test_request_compression():
+    """ Bodies over the threshold should be sent gzipped, and smaller or empty ones as before. """
+    import gzip
+    import json
+
+    fake, sent = scripted_tbapi([200, 200, 200])
+    fake.compress_requests_over = 100
+
+    request = fake.session.request
+    bodies: list[tuple[str | None, Any]] = []
+
+    def recording_request(method: str, url: str, **kwargs: Any):
+        bodies.append((kwargs["headers"].get("Content-Encoding"), kwargs.get("data", kwargs.get("json"))))
+        return request(method, url, **kwargs)
+
+    fake.session.request = recording_request
+
+    big = {"values": list(range(100))}
+    fake.post("/api/anything", big, "Error")
+    fake.post("/api/anything", {"small": 1}, "Error")
+    fake.post("/api/anything", None, "Error")
+
+    assert bodies[0][0] == "gzip" and json.loads(gzip.decompress(bodies[0][1])) == big
+    assert bodies[1][0] is None and json.loads(bodies[1][1]) == {"small": 1}
+    assert bodies[2] == (None, None)
+    assert "gzip" in fake.session.headers["Accept-Encoding"]
+
+
+def test_verbose_compressed_request(capsys: Any):
+    """ Verbose output should describe gzipped bodies rather than choke trying to print them. """
+    fake, sent = scripted_tbapi([200, 200])
+    fake.verbose = True
+    fake.compress_requests_over = 100
+
+    fake.post("/api/anything", {"values": list(range(100))}, "Error")
+    fake.post("/api/anything", {"small": 1}, "Error")
+
+    out = capsys.readouterr().out
+    assert len(sent) == 2
+    assert "Body:\n<gzip, " in out and 'Body:\n{"small":' in out
+
+
+def test_json_codecs():
+    """ Whichever codec is in use, bodies should round trip, and string payloads should be posted untouched. """
+    from datetime import datetime
+    from thingsboard_api_tools.JsonCodec import JsonCodec, OrjsonCodec, default_codec
+
+    codecs = [JsonCodec()] + ([OrjsonCodec()] if default_codec().name == "orjson" else [])
+    data = {"name": "Thermostat \u00b0C", "values": [1, 2.5, None, True], "nested": {"1": "a"}}
+
+    for codec in codecs:
+        assert isinstance(codec.dumps(data), bytes)
+        assert codec.loads(codec.dumps(data)) == data
+        assert codec.loads(codec.dumps(data).decode()) == data
+
+        for unencodable, error in ((float("nan"), ValueError), (float("-inf"), ValueError), (datetime.now(), TypeError)):
+            with pytest.raises(error):          # The same with or without orjson; never silently null or a string
+                codec.dumps({"values": [None, unencodable]})
+
+    fake, sent = scripted_tbapi([200])
+    request = fake.session.request
+    bodies: list[Any] = []
+
+    def recording_request(method: str, url: str, **kwargs: Any):
+        bodies.append(kwargs["data"])
+        return request(method, url, **kwargs)
+
+    fake.session.request = recording_request
+    assert fake.post("/api/anything", '{"already": "json"}', "Error") == {"ok": True}
+    assert bodies == [b'{"already": "json"}']
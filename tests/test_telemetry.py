@@ -2,8 +2,9 @@ from faker import Faker
 from datetime import datetime, timedelta
 import time
 import json as Json
+import pytest
 
-from thingsboard_api_tools.Device import Device, prepare_ts
+from thingsboard_api_tools.Device import Device, prepare_ts, get_telemetry_chunked
 from thingsboard_api_tools.TelemetryRecord import TelemetryRecord
 from tests.helpers import get_tbapi_from_env
 
@@ -218,3 +219,183 @@ def test_telemetry_record_serializer():
 def fake_device_name():
     """ Returns a fake name with __TEST_DEV__ prefix to make it easy to identify test devices. """
     return "__TEST_DEV__ " + fake.name()
+
+
+class FakeTelemetryServer:
+    """ Answers timeseries requests from canned data the way Thingsboard does: [startTs, endTs), limit per key, newest first unless orderBy=ASC. """
+
+    def __init__(self, data: dict[str, list[int]]):
+        self.data = data
+        self.requests = 0
+
+    def get(self, params: str, msg: str):
+        from urllib.parse import urlparse, parse_qs
+
+        self.requests += 1
+        query = {k: v[0] for k, v in parse_qs(urlparse(params).query).items()}
+        start, end, limit = int(query["startTs"]), int(query["endTs"]), int(query["limit"])
+        ascending = query.get("orderBy") == "ASC"
+
+        result = {}
+        for key in query["keys"].split(","):
+            in_range = sorted((ts for ts in self.data.get(key, []) if start <= ts < end), reverse=not ascending)[:limit]
+            if in_range:
+                result[key] = [{"ts": ts, "value": str(ts)} for ts in in_range]
+        return result
+
+
+def test_get_telemetry_chunked():
+    """ Chunked fetches should return every point exactly once, newest first, whatever the density and limit. """
+    start = 1_700_000_000_000
+    fast = [start + i * 1000 for i in range(3 * 3600)]                      # 1 Hz for three hours
+    burst = [start + 3600_000 + i for i in range(0, 5000, 2)]               # Plus a dense burst in the middle
+    slow = [start + i * 60_000 for i in range(180)]
+    data = {"fast": sorted(set(fast + burst)), "slow": slow}
+    end = start + 3 * 3600_000
+
+    for points_per_second in (None, 1, 100):
+        server = FakeTelemetryServer(data)
+        tel = get_telemetry_chunked(server, "device", ["fast", "slow", "missing"], start, end, points_per_second, limit=500)  # type: ignore
+
+        assert [p["ts"] for p in tel["fast"]] == sorted(data["fast"], reverse=True)
+        assert [p["ts"] for p in tel["slow"]] == sorted(slow, reverse=True)
+        assert "missing" not in tel
+        if points_per_second != 100:       # 100 is a wild overestimate, so expect lots of nearly empty windows
+            assert server.requests < 10 * len(data["fast"]) / 500
+
+    server = FakeTelemetryServer(data)
+    assert get_telemetry_chunked(server, "device", "slow", start, end, limit=500) == {"slow": [{"ts": ts, "value": str(ts)} for ts in reversed(slow)]}  # type: ignore
+    assert server.requests == 1
+
+
+def test_telemetry_cursor():
+    """ A cursor should walk every point in order, a page at a time, and pick up exactly where a saved position left off. """
+    from itertools import islice
+    from thingsboard_api_tools.TelemetryCursor import TelemetryCursor
+
+    start = 1_700_000_000_000
+    timestamps = [start + i * 1000 for i in range(2345)]
+    server = FakeTelemetryServer({"temp": timestamps})
+
+    assert [p["ts"] for p in TelemetryCursor(server, "device", "temp", page_size=500)] == timestamps      # type: ignore
+    assert server.requests == 5
+
+    newest_first = TelemetryCursor(server, "device", "temp", page_size=500, descending=True)      # type: ignore
+    assert [p["ts"] for p in newest_first] == timestamps[::-1]
+
+    blocks = list(TelemetryCursor(server, "device", "temp", start_ts=start + 1000_000, page_size=500).blocks())   # type: ignore
+    assert [len(b) for b in blocks] == [500, 500, 345]
+
+    for descending in (False, True):
+        cursor = TelemetryCursor(server, "device", "temp", page_size=300, descending=descending)      # type: ignore
+        first = [p["ts"] for p in islice(cursor, 1000)]
+        resumed = TelemetryCursor(server, "device", "temp", page_size=300, descending=descending, after=cursor.position)  # type: ignore
+        assert first + [p["ts"] for p in resumed] == sorted(timestamps, reverse=descending)
+
+
+def test_get_fleet_telemetry():
+    """ Each device should get its own complete history, keyed by guid, and the rows should flatten it oldest first. """
+    from thingsboard_api_tools.TbApi import TbApi
+    from thingsboard_api_tools.TbModel import Id
+
+    start = 1_700_000_000_000
+    end = start + 3600_000
+    servers = {
+        f"dev-{n}": FakeTelemetryServer({"temp": [start + i * 1000 for i in range(n * 100)], "state": [start]})
+        for n in range(20)
+    }
+
+    fleet_api = TbApi("http://localhost", "user", "password")
+    fleet_api.get = lambda params, msg: servers[params.split("/")[5]].get(params, msg)     # type: ignore   # /api/plugins/telemetry/DEVICE/{id}/values/...
+
+    devices = [Id(id=guid, entityType="DEVICE") for guid in servers] + ["dev-3"]        # Ids or guids, with a duplicate
+    fleet = fleet_api.get_fleet_telemetry(devices, ["temp", "state"], start, end, concurrency=4, limit=250)
+
+    assert list(fleet) == list(servers)
+    for guid, server in servers.items():
+        assert [p["ts"] for p in fleet[guid].get("temp", [])] == sorted(server.data["temp"], reverse=True)
+        assert fleet[guid]["state"] == [{"ts": start, "value": str(start)}]
+
+    one_shot = fleet_api.get_fleet_telemetry(["dev-1", "dev-2", "dev-3"], (key for key in ["state"]), start, end, concurrency=2)
+    assert one_shot == {guid: {"state": [{"ts": start, "value": str(start)}]} for guid in ("dev-1", "dev-2", "dev-3")}
+
+    rows = fleet_api.get_fleet_telemetry_rows(["dev-2", "dev-1"], "temp,state", start, end)
+    assert [(r.device_id, r.key) for r in rows[:3]] == [("dev-2", "temp")] * 3
+    assert [r.ts for r in rows if r.device_id == "dev-1" and r.key == "temp"] == servers["dev-1"].data["temp"]
+    assert rows[-1] == ("dev-1", "state", start, str(start))
+    assert len(rows) == 200 + 100 + 2
+
+
+def test_get_telemetry_chunked_matches_get_telemetry():
+    """ Against a real server, a chunked fetch with a tiny limit should find exactly what one big request does. """
+    dev = tbapi.create_device(fake_device_name())
+    try:
+        start = int(time.time() * 1000) - 60_000
+        for i in range(30):
+            dev.send_telemetry({"a": i, "b": i * 2}, ts=start + i * 1000)
+
+        expected = dev.get_telemetry(["a", "b"], start_ts=start, limit=1000)
+        chunked = dev.get_telemetry_chunked(["a", "b"], start, limit=7)
+
+        assert chunked == expected
+        assert len(chunked["a"]) == 30
+    finally:
+        dev.delete()
+
+
+def test_telemetry_columns():
+    """ Numeric telemetry should become float64 arrays (with NaN for gaps), anything else (even bools) object arrays. """
+    np = pytest.importorskip("numpy")
+    from thingsboard_api_tools.TelemetryColumns import to_columns
+
+    columns = to_columns({
+        "temp": [{"ts": 3000, "value": 21.5}, {"ts": 2000, "value": None}, {"ts": 1000, "value": 20}],
+        "state": [{"ts": 3000, "value": "on"}, {"ts": 1000, "value": "off"}],
+        "none": [{"ts": None, "value": None}],
+        "code": [{"ts": 2000, "value": "00123"}, {"ts": 1000, "value": "7"}],
+        "flag": [{"ts": 2000, "value": True}, {"ts": 1000, "value": False}],
+        "mixed": [{"ts": 2000, "value": 1.5}, {"ts": 1000, "value": "2.5"}],
+    })
+
+    assert columns["temp"].ts.dtype == np.int64 and list(columns["temp"].ts) == [3000, 2000, 1000]
+    assert columns["temp"].values.dtype == np.float64
+    assert columns["temp"].values[0] == 21.5 and np.isnan(columns["temp"].values[1])
+    assert columns["state"].values.dtype == object and list(columns["state"].values) == ["on", "off"]
+    assert len(columns["none"].ts) == 0
+    assert columns["code"].values.dtype == object and list(columns["code"].values) == ["00123", "7"]     # Strict types are kept
+    assert columns["flag"].values.dtype == object and list(columns["flag"].values) == [True, False]
+    assert columns["flag"].values[0] is True
+    assert columns["mixed"].values.dtype == object and list(columns["mixed"].values) == [1.5, "2.5"]
+
+
+def test_telemetry_store(tmp_path):
+    """ A second look at the same range should come from the file, fetching only what's new since the first. """
+    from thingsboard_api_tools.TelemetryStore import TelemetryStore
+
+    now = prepare_ts(datetime.now())
+    start = now - 30 * 24 * 3600_000
+    data = {"temp": [start + i * 600_000 for i in range(30 * 24 * 6)], "state": [start + i * 3600_000 for i in range(30 * 24)]}
+    server = FakeTelemetryServer(data)
+    path = str(tmp_path / "telemetry.sqlite")
+
+    store = TelemetryStore(server, path)        # type: ignore
+    first = store.get_telemetry("device", ["temp", "state"], start, now)
+    assert [p["ts"] for p in first["temp"]] == sorted(data["temp"], reverse=True)
+    assert [p["ts"] for p in first["state"]] == sorted(data["state"], reverse=True)
+    assert first["temp"][0]["value"] == str(data["temp"][-1])       # Values come back as they were sent
+    store.close()
+
+    data["temp"].append(now + 1000)     # New data arrives; a later run should fetch just that
+    requests = server.requests
+    store = TelemetryStore(server, path)        # type: ignore
+    second = store.get_telemetry("device", ["temp", "state"], start, now + 2000)
+
+    assert server.requests - requests == 1      # One request for the settle window and the new point, both keys at once
+    assert second["temp"][0]["ts"] == now + 1000 and second["temp"][1:] == first["temp"]
+    [(covered_start, covered_end)] = store.coverage("device", "temp")      # One merged range, stopping short of the settle window
+    assert covered_start == start and now - 6 * 60_000 < covered_end < now
+
+    assert store.get_telemetry("device", "temp", start - 3600_000, start, sync=False) == {}
+    store.forget("device", "temp")
+    assert store.coverage("device", "temp") == [] and store.coverage("device", "state") != []
+
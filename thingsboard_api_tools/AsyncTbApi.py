@@ -0,0 +1,489 @@
+# Copyright 2018-2024, Chris Eykamp
+
+# MIT License
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from typing import Optional, Any, Awaitable, Callable, Union, Iterable, Type, TYPE_CHECKING
+
+import asyncio
+import json as Json
+import requests
+import time
+from http import HTTPStatus
+
+from .TbApi import TbApi, SortClause, MINUTES, ConfigurationError, U, _Attempts, _active_clause, _encode_body, _exact_match_or_none, _with_server_sort
+from .TbModel import Attributes
+from .Device import AggregationType, Timestamp, telemetry_params
+
+if TYPE_CHECKING:
+    import httpx        # pip install httpx
+    from .Customer import Customer, CustomerId
+    from .Dashboard import Dashboard, DashboardHeader
+    from .Device import Device
+    from .DeviceProfile import DeviceProfile
+    from .TbModel import Id, TbObject
+
+
+class AsyncTbApi:
+    """
+    asyncio counterpart to TbApi, for keeping many requests in flight on a single event loop.
+
+    Objects returned here are the regular models, attached to a synchronous TbApi (self.tbapi) that shares our
+    credentials, so their own methods keep working.  Those methods block, though; use the awaitable equivalents
+    on this class (get_telemetry(device, ...), get_attributes(device, ...), etc.) for anything you want to run
+    concurrently.
+
+    Requires httpx (pip install httpx).
+    """
+
+    def __init__(self, url: str, username: str, password: str, token_timeout: float = 10 * MINUTES, max_concurrency: int = 100):
+        """
+        max_concurrency: Maximum number of requests in flight at once; also sizes the connection pool
+        """
+        import httpx        # Optional dependency; only needed if you use the async client
+
+        self.tbapi = TbApi(url, username, password, token_timeout)
+        self.max_concurrency = max_concurrency
+
+        limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        self.client: "httpx.AsyncClient" = httpx.AsyncClient(limits=limits, timeout=None)
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._token_lock = asyncio.Lock()
+
+
+    @property
+    def mothership_url(self) -> str:
+        return self.tbapi.mothership_url
+
+
+    @property
+    def verbose(self) -> bool:
+        return self.tbapi.verbose
+
+
+    @verbose.setter
+    def verbose(self, verbose: bool):
+        self.tbapi.verbose = verbose
+
+
+    async def aclose(self) -> None:
+        """ Closes pooled connections used by both this client and the synchronous TbApi it wraps. """
+        await self.client.aclose()
+        self.tbapi.close()
+
+
+    async def __aenter__(self) -> "AsyncTbApi":
+        return self
+
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.aclose()
+
+
+    async def get_token(self) -> str:
+        """
+        Returns an access token, logging in if needed.  Token handling is delegated to our synchronous TbApi so both
+        share a single token.
+        """
+        if self.tbapi.has_valid_token():
+            assert self.tbapi.token
+            return self.tbapi.token
+
+        async with self._token_lock:        # Only one coroutine logs in; the others wait for it and use its token
+            return await asyncio.to_thread(self.tbapi.get_token)
+
+
+    async def add_auth_header(self, headers: dict[str, str]):
+        """ Modifies headers """
+        headers["X-Authorization"] = "Bearer " + await self.get_token()
+
+
+    async def get(self, params: str, msg: str) -> Any:
+        return self.tbapi.json_codec.loads(await self.get_raw(params, msg))
+
+
+    async def get_raw(self, params: str, msg: str) -> bytes:
+        """ Like get(), but returns the undecoded response body """
+        if self.mothership_url is None:
+            raise ConfigurationError("Cannot retrieve data without a URL: pass the url of your Thingsboard server when creating the AsyncTbApi.")
+
+        cache = self.tbapi.response_cache
+        if cache is not None:
+            content = cache.get(params, self.tbapi._cache_scope())
+            if content is not None:
+                return content
+
+        response = await self._send("GET", params, {"Accept": "application/json"})
+        AsyncTbApi.validate_response(response, msg)
+
+        if cache is not None:
+            cache.put(params, response.content, self.tbapi._cache_scope())
+
+        return response.content
+
+
+    async def delete(self, params: str, msg: str) -> bool:
+        response = await self._send("DELETE", params, {"Accept": "application/json"})
+        if self.tbapi.response_cache is not None:
+            self.tbapi.response_cache.invalidate_for_write(params, self.tbapi._cache_scope())
+
+        # Don't fail if not found
+        if response.status_code == HTTPStatus.NOT_FOUND:
+            return False
+
+        AsyncTbApi.validate_response(response, msg)
+
+        return True
+
+
+    async def post(self, params: str, data: Optional[Union[str, dict[str, Any]]], msg: str, idempotent: bool = False) -> dict[str, Any]:
+        """ Data can be a string (already JSON) or a dict; see TbApi.post() for idempotent """
+        body, encoding = _encode_body(data, self.tbapi.json_codec, self.tbapi.compress_requests_over)
+        headers = {"Accept": "application/json", "Content-Type": "application/json"} | encoding
+
+        resp = await self._send("POST", params, headers, idempotent, content=body)
+
+        if self.tbapi.response_cache is not None:
+            self.tbapi.response_cache.invalidate_for_write(params, self.tbapi._cache_scope())
+        AsyncTbApi.validate_response(resp, msg)
+
+        if not resp.content:
+            return {}
+
+        return self.tbapi.json_codec.loads(resp.content)
+
+
+    async def get_paged(self, params: str, msg: str, page_size: Optional[int] = None) -> list[dict[str, Any]]:
+        """
+        Like TbApi.get_paged(), but once the first page tells us how many there are, the rest are fetched concurrently.
+        Pages are reassembled in order.  Page sizes come from our TbApi's page_sizes, default_page_size and
+        adaptive_paging, unless page_size is given.
+        """
+        endpoint = params.split("?")[0]
+        fixed_size = page_size is not None
+        page_size = page_size or self.tbapi._initial_page_size(endpoint)
+
+        first = await self._get_page(params, msg, 0, page_size)
+        resps = [first] + list(await asyncio.gather(*[
+            self._get_page(params, msg, page, page_size) for page in range(1, first["totalPages"])
+        ]))
+
+        all_data: list[dict[str, Any]] = []
+        for resp in resps:
+            all_data += resp["data"]
+
+        # Items were added after we read totalPages; pick up the stragglers one page at a time, as TbApi.get_paged() does
+        offset = len(resps) * page_size
+        while resps[-1]["hasNext"]:
+            if not fixed_size:
+                page_size = self.tbapi._next_page_size(endpoint, offset, page_size)
+
+            resps.append(await self._get_page(params, msg, offset // page_size, page_size))
+            all_data += resps[-1]["data"]
+            offset += page_size
+
+        return all_data
+
+
+    async def _get_page(self, params: str, msg: str, page: int, page_size: int) -> dict[str, Any]:
+        """ Async version of TbApi._get_page(), reporting to the same adaptive_paging """
+        joiner = "&" if "?" in params else "?"
+
+        start = time.perf_counter()
+        content = await self.get_raw(f"{params}{joiner}page={page}&pageSize={page_size}", msg)
+        resp = self.tbapi.json_codec.loads(content)
+
+        if self.tbapi.adaptive_paging:
+            self.tbapi.adaptive_paging.observe(params.split("?")[0], page_size, len(resp["data"]), len(content), time.perf_counter() - start)
+
+        return resp
+
+
+    async def _send(self, method: str, params: str, headers: dict[str, str], idempotent: bool = False, **kwargs: Any) -> "httpx.Response":
+        """
+        Async version of TbApi._send(): adds our auth header, renews the token and retries once on a 401, and retries
+        other failures as our TbApi's retry_policy allows.  Shares our TbApi's stats and rate_limiter.
+        """
+        import httpx
+
+        url = self.mothership_url + params
+        attempts = _Attempts(self.tbapi, method, params, idempotent)
+
+        if self.verbose:
+            TbApi.pretty_print_request(requests.Request(method, url, headers=headers, data=kwargs.get("content")))
+
+        while True:
+            token = await self.get_token()
+            wait = attempts.rate_limit_wait()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            try:
+                async with self._semaphore:
+                    response = await self.client.request(method, url, headers=headers | {"X-Authorization": "Bearer " + token}, **kwargs)
+            except httpx.TransportError as ex:        # Connection problems and timeouts
+                delay = attempts.retry_after_error(ex)
+                if delay is None:
+                    raise
+            else:
+                delay = attempts.retry_after_response(response.status_code, response.headers.get("Retry-After"), token)
+                if delay is None:
+                    return response
+
+            await asyncio.sleep(delay)          # Outside the semaphore, so waiting doesn't hold up other requests
+
+
+    @staticmethod
+    def validate_response(resp: "httpx.Response", msg: str) -> None:
+        import httpx
+
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as ex:
+            ex.args += (msg, f"RESPONSE BODY: {resp.content.decode('utf8')}")       # Append response to the exception to make it easier to diagnose
+            raise
+
+
+    # Entity lookups -- these mirror the TbApi methods of the same name
+
+    async def get_all_devices(self, is_active: Optional[bool] = None, sort_by: SortClause = None) -> list["Device"]:
+        from .Device import Device
+
+        all_results = await self.get_paged(_with_server_sort(f"/api/tenant/deviceInfos{_active_clause(is_active)}", sort_by, Device), "Error fetching list of all Devices")
+        return self.tbapi.tb_objects_from_list(all_results, Device, sort_by)
+
+
+    async def get_devices_by_name(self, device_name_prefix: str, sort_by: SortClause = None) -> list["Device"]:
+        from .Device import Device
+
+        data = await self.get_paged(_with_server_sort(f"/api/tenant/deviceInfos?textSearch={device_name_prefix}", sort_by, Device), f"Error fetching devices with name matching '{device_name_prefix}'")
+        return self.tbapi.tb_objects_from_list(data, Device, sort_by)
+
+
+    async def get_device_by_name(self, device_name: str | None) -> Optional["Device"]:
+        """ Returns a device with the specified name, or None if we can't find one """
+        from .Device import Device
+
+        if device_name is None:
+            return None
+
+        newest_first = self.tbapi._newest_first(Device, "/api/tenant/deviceInfos", "Error fetching list of all Devices")
+        return await self._find_by_name(Device, device_name, newest_first, self.get_devices_by_name)
+
+
+    async def get_device_by_id(self, device_id: Union["Id", str]) -> "Device":
+        from .Device import Device
+        from .TbModel import Id
+
+        if isinstance(device_id, Id):
+            device_id = device_id.id
+
+        cached = self.tbapi._cached_entity(Device, device_id)      # Shares TbApi's entity_cache, if it has one
+        if cached is not None:
+            return cached
+
+        obj = await self.get(f"/api/device/info/{device_id}", f"Could not retrieve Device with id '{device_id}'")
+
+        # Same TB 3.2 NULL_GUID workaround as TbApi.get_device_by_id()
+        if obj["customerId"]["id"] == TbApi.NULL_GUID:
+            device = await self.get_device_by_name(obj["name"])
+            assert device
+            return self.tbapi._cache_entity(device)
+
+        return self.tbapi._cache_entity(Device(self.tbapi, **obj))
+
+
+    async def get_device_profile_by_id(self, device_profile_id: Union["Id", str]) -> "DeviceProfile":
+        from .DeviceProfile import DeviceProfile
+        from .TbModel import Id
+
+        if isinstance(device_profile_id, Id):
+            device_profile_id = device_profile_id.id
+
+        cached = self.tbapi._cached_entity(DeviceProfile, device_profile_id)
+        if cached is not None:
+            return cached
+
+        obj = await self.get(f"/api/deviceProfile/{device_profile_id}", f"Could not retrieve DeviceProfile with id '{device_profile_id}'")
+        return self.tbapi._cache_entity(DeviceProfile(tbapi=self.tbapi, **obj))
+
+
+    async def get_all_customers(self, sort_by: SortClause = None) -> list["Customer"]:
+        from .Customer import Customer
+
+        all_results = await self.get_paged(_with_server_sort("/api/customers", sort_by, Customer), "Error fetching list of all customers")
+        return self.tbapi.tb_objects_from_list(all_results, Customer, sort_by)
+
+
+    async def get_customer_by_id(self, cust_id: Union["CustomerId", "Id", str]) -> Optional["Customer"]:
+        from .Customer import Customer, CustomerId
+        from .TbModel import Id
+
+        if isinstance(cust_id, CustomerId):
+            cust_id = cust_id.id.id
+        elif isinstance(cust_id, Id):
+            cust_id = cust_id.id
+
+        if cust_id == TbApi.NULL_GUID:
+            return None
+
+        cached = self.tbapi._cached_entity(Customer, cust_id)
+        if cached is not None:
+            return cached
+
+        obj = await self.get(f"/api/customer/{cust_id}", f"Could not retrieve Customer with id '{cust_id}'")
+        return self.tbapi._cache_entity(Customer.model_validate(obj | {"tbapi": self.tbapi}))
+
+
+    async def get_customers_by_name(self, cust_name_prefix: str, sort_by: SortClause = None) -> list["Customer"]:
+        from .Customer import Customer
+
+        cust_datas = await self.get_paged(_with_server_sort(f"/api/customers?textSearch={cust_name_prefix}", sort_by, Customer), f"Error retrieving customers with names starting with '{cust_name_prefix}'")
+
+        for cust_data in cust_datas:
+            # Sometimes this comes in as a dict, sometimes as a string, as noted in TbApi.get_customers_by_name()
+            if cust_data["additionalInfo"] is not None and not isinstance(cust_data["additionalInfo"], dict):
+                cust_data["additionalInfo"] = Json.loads(cust_data["additionalInfo"])
+
+        return self.tbapi.tb_objects_from_list(cust_datas, Customer, sort_by)
+
+
+    async def get_customer_by_name(self, cust_name: str) -> Optional["Customer"]:
+        """ Returns a customer with the specified name, or None if we can't find one """
+        from .Customer import Customer
+
+        newest_first = self.tbapi._newest_first(Customer, "/api/customers", "Error fetching list of all customers")
+        return await self._find_by_name(Customer, cust_name, newest_first, self.get_customers_by_name)
+
+
+    async def _find_by_name(
+        self, object_type: Type[U], name: str, newest_first: Callable[[], Iterable[U]], search: Callable[[str], Awaitable[list[U]]]
+    ) -> U | None:
+        """
+        Async version of TbApi._find_by_name(), sharing its name_index.  Refreshing the index uses the synchronous
+        listing, so it runs on a worker thread.
+        """
+        index = self.tbapi.name_index
+        if index is None:
+            return _exact_match_or_none(name, await search(name))
+
+        obj = await asyncio.to_thread(index.lookup, object_type, name, newest_first)
+        if obj is not None or index.trust_misses:
+            return obj
+
+        obj = _exact_match_or_none(name, await search(name))
+        if obj is not None:
+            index.add(obj)
+        return obj
+
+
+    async def get_customer_devices(self, customer: "Customer", sort_by: SortClause = None) -> list["Device"]:
+        """ Async version of Customer.get_devices(); will not include public devices! """
+        from .Device import Device
+
+        cust_id = customer.id.id
+
+        all_results = await self.get_paged(_with_server_sort(f"/api/customer/{cust_id}/devices", sort_by, Device), f"Error retrieving devices for customer '{cust_id}'")
+        return self.tbapi.tb_objects_from_list(all_results, Device, sort_by)
+
+
+    async def get_all_dashboard_headers(self, sort_by: SortClause = None) -> list["DashboardHeader"]:
+        from .Dashboard import DashboardHeader
+
+        all_results = await self.get_paged(_with_server_sort("/api/tenant/dashboards", sort_by, DashboardHeader), "Error fetching list of all dashboards")
+        return self.tbapi.tb_objects_from_list(all_results, DashboardHeader, sort_by)
+
+
+    async def get_dashboard_header_by_id(self, dash_id: Union["Id", str]) -> "DashboardHeader":
+        from .Dashboard import DashboardHeader
+        from .TbModel import Id
+
+        if isinstance(dash_id, Id):
+            dash_id = dash_id.id
+
+        cached = self.tbapi._cached_entity(DashboardHeader, dash_id)
+        if cached is not None:
+            return cached
+
+        obj = await self.get(f"/api/dashboard/info/{dash_id}", f"Error retrieving dashboard for '{dash_id}'")
+        return self.tbapi._cache_entity(DashboardHeader.model_validate(obj | {"tbapi": self.tbapi}))
+
+
+    async def get_dashboard(self, dash: Union["DashboardHeader", "Id", str]) -> "Dashboard":
+        """ Async version of DashboardHeader.get_dashboard(); pass a header or a dashboard id. """
+        from .Dashboard import Dashboard, DashboardHeader
+        from .TbModel import Id
+
+        if isinstance(dash, DashboardHeader):
+            dash_id = dash.id.id
+        elif isinstance(dash, Id):
+            dash_id = dash.id
+        else:
+            dash_id = dash
+
+        obj = await self.get(f"/api/dashboard/{dash_id}", f"Error retrieving dashboard definition for '{dash_id}'")
+        return Dashboard.model_validate(obj | {"tbapi": self.tbapi})
+
+
+    # Telemetry and attributes -- these mirror the Device and HasAttributes methods of the same name
+
+    async def get_telemetry(
+        self,
+        device: "Device",
+        keys: Union[str, Iterable[str]],
+        start_ts: Optional[Timestamp] = None,
+        end_ts: Optional[Timestamp] = None,
+        interval: Optional[int] = None,
+        limit: int = 100,
+        agg: AggregationType = AggregationType.NONE,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """ Async version of Device.get_telemetry() """
+        params = telemetry_params(device.id.id, keys, start_ts, end_ts, interval, limit, agg)
+        return await self.get(params, f"Error retrieving telemetry for device '{device}' with params '{params}'")
+
+
+    async def get_latest_telemetry(self, device: "Device", keys: Union[str, Iterable[str]]) -> dict[str, list[dict[str, Any]]]:
+        """ Async version of Device.get_latest_telemetry(), without the time option """
+        if not isinstance(keys, str):
+            keys = ",".join(keys)
+
+        url = f"/api/plugins/telemetry/DEVICE/{device.id.id}/values/timeseries?keys={keys}&useStrictDataTypes=true"
+        return await self.get(url, f"Error retrieving latest telemetry for device '{device.id.id}' with keys '{keys}'")
+
+
+    async def get_telemetry_keys(self, device: "Device") -> list[str]:
+        return await self.get(f"/api/plugins/telemetry/DEVICE/{device.id.id}/keys/timeseries", f"Error retrieving telemetry keys for device '{device.id.id}'")
+
+
+    async def get_attributes(self, obj: "TbObject", scope: Attributes.Scope) -> Attributes:
+        """ Async version of the get_*_attributes() methods of HasAttributes """
+        id = obj.id
+
+        url = f"/api/plugins/telemetry/{id.entity_type}/{id.id}/values/attributes/{scope.value}"
+        attribute_data = await self.get(url, f"Error retrieving {scope.value} attributes for '{id}'")
+
+        return Attributes(attribute_data, scope)
+
+
+    async def set_attributes(self, obj: "TbObject", attributes: Union[Attributes, dict[str, Any]], scope: Attributes.Scope) -> dict[str, Any]:
+        """ Async version of the set_*_attributes() methods of HasAttributes """
+        if isinstance(attributes, Attributes):
+            attributes = attributes.as_dict()
+
+        id = obj.id
+
+        url = f"/api/plugins/telemetry/{id.entity_type}/{id.id}/{scope.value}"
+        return await self.post(url, attributes, f"Error setting {scope.value} attributes for '{id}'")
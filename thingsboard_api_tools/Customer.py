@@ -15,12 +15,12 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from typing import  Any, TYPE_CHECKING
+from typing import  Any, ClassVar, Generator, TYPE_CHECKING
 from pydantic import Field       # pip install pydantic
 
 from .HasAttributes import HasAttributes
 from .TbModel import TbModel, Id, TbObject
-from .TbApi import SortClause
+from .TbApi import SortClause, _with_server_sort
 
 
 if TYPE_CHECKING:
@@ -56,9 +56,24 @@ class Customer(TbObject, HasAttributes):
     phone: str | None
     additional_info: dict[str, Any] | None = Field(default={}, alias="additionalInfo")
 
+    server_sort_properties: ClassVar[dict[str, str]] = {
+        "name": "title",
+        "email": "email",
+        "country": "country",
+        "state": "state",
+        "city": "city",
+        "address": "address",
+        "address2": "address2",
+        "zip": "zip",
+        "phone": "phone",
+        "created_time": "createdTime",
+    }
+
 
     def update(self):
-        return self.tbapi.post("/api/customer", self.model_dump_json(by_alias=True), "Error updating customer")
+        result = self.tbapi.post("/api/customer", self.model_dump_json(by_alias=True), "Error updating customer")
+        self.tbapi.invalidate_cached(self.id)
+        return result
 
 
     def is_public(self) -> bool:
@@ -93,12 +108,25 @@ class Customer(TbObject, HasAttributes):
 
         cust_id = self.id.id
 
-        all_results = self.tbapi.get_paged(f"/api/customer/{cust_id}/devices", f"Error retrieving devices for customer '{cust_id}'")
+        all_results = self.tbapi.get_paged(_with_server_sort(f"/api/customer/{cust_id}/devices", sort_by, Device), f"Error retrieving devices for customer '{cust_id}'")
         return self.tbapi.tb_objects_from_list(all_results, Device, sort_by)       # Circular... Device gets defined below, but refers to Customer...
 
 
+    def iter_devices(self, sort_by: SortClause = None) -> Generator["Device", None, None]:
+        """
+        Generator version of get_devices(); yields devices page by page as they arrive.  Will not include public devices!
+        sort_by: Done server-side; see TbApi.iter_tb_objects()
+        """
+        from .Device import Device
+
+        cust_id = self.id.id
+
+        return self.tbapi.iter_tb_objects(f"/api/customer/{cust_id}/devices", f"Error retrieving devices for customer '{cust_id}'", Device, sort_by)
+
+
     def delete(self) -> bool:
         """
         Deletes the customer from the server, returns True if customer was deleted, False if it did not exist
         """
+        self.tbapi.invalidate_cached(self.id)
         return self.tbapi.delete(f"/api/customer/{self.id.id}", f"Error deleting customer '{self.id.id}'")
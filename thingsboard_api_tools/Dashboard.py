@@ -15,7 +15,7 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from typing import  Dict, List, Any, Optional
+from typing import  Dict, List, Any, Optional, ClassVar
 from pydantic import Field
 
 from .TbModel import Id, TbObject, TbModel
@@ -204,6 +204,11 @@ class DashboardHeader(TbObject):
     mobile_order: int | None = Field(default=None, alias="mobileOrder")
     external_id: Id | None = Field(default=None, alias="externalId")
 
+    server_sort_properties: ClassVar[dict[str, str]] = {
+        "name": "title",
+        "created_time": "createdTime",
+    }
+
     # Other observed fields
     # resources
     # version: int
@@ -230,6 +235,7 @@ class DashboardHeader(TbObject):
         dashboard_id = self.id.id
         customer_id = customer.id.id
         resp = self.tbapi.post(f"/api/customer/{customer_id}/dashboard/{dashboard_id}", None, f"Could not assign dashboard '{dashboard_id}' to customer '{customer_id}'")
+        self.tbapi.invalidate_cached(self.id)
 
         # Update customer object with new assignments
         self.assigned_customers = []
@@ -255,6 +261,7 @@ class DashboardHeader(TbObject):
             return
 
         self.tbapi.post(f"/api/customer/public/dashboard/{self.id.id}", None, f"Error assigning dash '{self.id.id}' to public customer")
+        self.tbapi.invalidate_cached(self.id)
         # self.customer_id = Id(**obj["customerId"])
 
         public_id = self.tbapi.get_public_user_id()
@@ -271,6 +278,7 @@ class DashboardHeader(TbObject):
             return
 
         self.tbapi.delete(f"/api/customer/public/dashboard/{self.id.id}", f"Error removing the public customer from dash '{self.id.id}'")
+        self.tbapi.invalidate_cached(self.id)
         # self.customer_id = Id(**obj["customerId"])
 
         public_id = self.tbapi.get_public_user_id()
@@ -303,7 +311,9 @@ class DashboardHeader(TbObject):
         """
         Writes object back to the database.  Use this if you want to save any modified properties.
         """
-        return self.tbapi.post("/api/dashboard", self.model_dump_json(by_alias=True), f"Error updating '{self.id}'")
+        result = self.tbapi.post("/api/dashboard", self.model_dump_json(by_alias=True), f"Error updating '{self.id}'")
+        self.tbapi.invalidate_cached(self.id)
+        return result
 
 
     def delete(self) -> bool:
@@ -311,6 +321,7 @@ class DashboardHeader(TbObject):
         Returns True if dashboard was deleted, False if it did not exist
         """
         dashboard_id = self.id.id
+        self.tbapi.invalidate_cached(self.id)
         return self.tbapi.delete(f"/api/dashboard/{dashboard_id}", f"Error deleting dashboard '{dashboard_id}'")
 
 
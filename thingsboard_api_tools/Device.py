@@ -15,12 +15,13 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from typing import  Optional, Dict, List, Any, Union, Iterable, TYPE_CHECKING
+from typing import  Optional, Dict, List, Any, Union, Iterable, ClassVar, NamedTuple, TYPE_CHECKING
 from datetime import datetime, timedelta
 from enum import Enum
 from pydantic import Field
 
 from .TbModel import TbObject, Id
+from .TbApi import _map_concurrent
 from .HasAttributes import HasAttributes
 from .DeviceProfile import DeviceProfile, DeviceProfileInfo
 
@@ -28,10 +29,23 @@ from .DeviceProfile import DeviceProfile, DeviceProfileInfo
 if TYPE_CHECKING:
     from .TbModel import TbApi
     from .Customer import Customer
+    from .TelemetryCursor import TelemetryCursor
+    from .TelemetryColumns import TelemetryColumns
 
 
 Timestamp = Union[datetime, float]
 
+CHUNK_FILL = 0.5                # Size telemetry windows to be about half full, so most come back complete on the first try
+MAX_WINDOWS_PER_SPLIT = 1000    # Keeps a bad density estimate from turning into millions of tiny windows; full ones get split again
+
+
+class TelemetryRow(NamedTuple):
+    """ One point in a long-format telemetry table, as returned by TbApi.get_fleet_telemetry_rows() """
+    device_id: str
+    key: str
+    ts: int
+    value: Any
+
 
 class AggregationType(Enum):
     MIN = "MIN"
@@ -74,6 +88,15 @@ class Device(TbObject, HasAttributes):
 
     _device_token: Optional[str] = None
 
+    server_sort_properties: ClassVar[dict[str, str]] = {
+        "name": "name",
+        "label": "label",
+        "type": "type",
+        "device_profile_name": "deviceProfileName",
+        "customer_name": "customerTitle",
+        "created_time": "createdTime",
+    }
+
 
     def __type_hints__(self, device_token: str):
         """ Dummy method to annotate the instance attribute types """
@@ -89,6 +112,7 @@ class Device(TbObject, HasAttributes):
 
     def delete(self) -> bool:
         """ Returns True if device was deleted, False if it did not exist """
+        self.tbapi.invalidate_cached(self.id)
         return self.tbapi.delete(f"/api/device/{self.id.id}", f"Error deleting device '{self.id.id}'")
 
 
@@ -97,6 +121,7 @@ class Device(TbObject, HasAttributes):
             obj = self.tbapi.post(f"/api/customer/{customer.id.id}/device/{self.id.id}", None, f"Error assigning device '{self.id.id}' to customer {customer}")
             self.customer_id = Id.model_validate(obj["customerId"])
             self.customer_name = customer.name
+            self.tbapi.invalidate_cached(self.id)
 
 
     def get_customer(self) -> Optional["Customer"]:
@@ -109,6 +134,7 @@ class Device(TbObject, HasAttributes):
         if not self.is_public():
             obj = self.tbapi.post(f"/api/customer/public/device/{self.id.id}", None, f"Error assigning device '{self.id.id}' to public customer")
             self.customer_id = Id.model_validate(obj["customerId"])
+            self.tbapi.invalidate_cached(self.id)
 
 
     def is_public(self) -> bool:
@@ -141,36 +167,71 @@ class Device(TbObject, HasAttributes):
         keys: Pass a single key or a list of keys
         Note: Returns a sane amount of data by default, in same shape as get_latest_telemetry()
         """
-        if isinstance(keys, str):
-            keys = keys
-        else:
-            keys = ",".join(keys)
+        params = telemetry_params(self.id.id, keys, start_ts, end_ts, interval, limit, agg)
+        error_message = f"Error retrieving telemetry for device '{self}' with params '{params}'"
 
-        # Don't include these in the signature because datetime.now() gets evaluated once when function is first called, then reused after that.
-        # It's lame, but it's the way default values are managed in Python.  Blame Guido.
-        # Same principle as this: https://web.archive.org/web/20201002220217/http://effbot.org/zone/default-values.htm
-        if start_ts is None:
-            start_ts = 0
-        if end_ts is None:
-            end_ts = datetime.now()
+        return self.tbapi.get(params, error_message)
+        # https://demo.thingsboard.io/swagger-ui.html#/telemetry-controller/getTimeseriesUsingGET
 
 
-        start_ts = prepare_ts(start_ts)
-        end_ts = prepare_ts(end_ts)
+    def get_telemetry_columns(
+        self,
+        keys: Union[str, Iterable[str]],
+        start_ts: Optional[Timestamp] = None,
+        end_ts: Optional[Timestamp] = None,
+        interval: Optional[int] = None,
+        limit: int = 100,
+        agg: AggregationType = AggregationType.NONE,
+    ) -> Dict[str, "TelemetryColumns"]:
+        """
+        Like get_telemetry(), but returns each key's points as numpy arrays: int64 timestamps and float64 values (object
+        if any aren't numbers), which take a fraction of the memory and are far quicker to analyze.  Needs numpy.  For
+        other results, like get_latest_telemetry()'s or get_telemetry_chunked()'s, use thingsboard_api_tools.to_columns().
+        """
+        from .TelemetryColumns import to_columns
 
-        # These are all optional parameters, strictly speaking
-        interval_clause = f"&interval={interval}" if interval else ""
-        limit_caluse = f"&limit={limit}" if limit else ""
-        agg_clause = f"&agg={agg.value}"
-        use_strict_datatypes_clause = "&useStrictDataTypes=true"       # Fixes bug of getting back strings as numbers
+        return to_columns(self.get_telemetry(keys, start_ts, end_ts, interval, limit, agg))
 
-        clauses = interval_clause + limit_caluse + agg_clause + use_strict_datatypes_clause
-        params = f"/api/plugins/telemetry/DEVICE/{self.id.id}/values/timeseries?keys={keys}&startTs={start_ts}&endTs={end_ts}{clauses}"
 
-        error_message = f"Error retrieving telemetry for device '{self}' with date range '{start_ts}-{end_ts}' and keys '{keys}'"
+    def get_telemetry_chunked(
+        self,
+        keys: Union[str, Iterable[str]],
+        start_ts: Timestamp,
+        end_ts: Optional[Timestamp] = None,
+        points_per_second: Optional[float] = None,
+        limit: int = 10_000,
+        concurrency: int = 4,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Like get_telemetry(), but returns every point between start_ts and end_ts however many there are, by splitting the
+        range into windows that each fit under limit and fetching them concurrently.  Results are in the same shape as
+        get_telemetry(): newest first per key, with no duplicates.
+        points_per_second: Expected density of the busiest key, used to size the windows.  If omitted, it is estimated
+            from the newest limit points.  Either way, windows that come back full are split and fetched again.
+        limit: Most points per key to ask for in one request
+        concurrency: Most requests in flight at once
+        """
+        return get_telemetry_chunked(self.tbapi, self.id.id, keys, start_ts, end_ts, points_per_second, limit, concurrency)
 
-        return self.tbapi.get(params, error_message)
-        # https://demo.thingsboard.io/swagger-ui.html#/telemetry-controller/getTimeseriesUsingGET
+
+    def iter_telemetry(
+        self,
+        key: str,
+        start_ts: Optional[Timestamp] = None,
+        end_ts: Optional[Timestamp] = None,
+        page_size: int = 1000,
+        descending: bool = False,
+        after: Optional[int] = None,
+    ) -> "TelemetryCursor":
+        """
+        Walks every point of one key, oldest first (or newest first if descending), fetching page_size points at a
+        time, so memory use doesn't depend on how much history there is.  Iterate over the result for points in
+        get_telemetry()'s {"ts": ..., "value": ...} form, or call its blocks() for a page at a time.  To pick up
+        later where you left off, save the cursor's position and pass it back as after.
+        """
+        from .TelemetryCursor import TelemetryCursor
+
+        return TelemetryCursor(self.tbapi, self.id.id, key, start_ts, end_ts, page_size, descending, after)
 
 
     def send_telemetry(self, data: Dict[str, Any], ts: Optional[Timestamp | int] = None):
@@ -278,10 +339,108 @@ class Device(TbObject, HasAttributes):
         """
         Writes object back to the database.  Use this if you want to save any modified properties.
         """
-        return self.tbapi.post("/api/device", self.model_dump_json(by_alias=True), f"Error updating '{self.id.id}'")
+        result = self.tbapi.post("/api/device", self.model_dump_json(by_alias=True), f"Error updating '{self.id.id}'")
+        self.tbapi.invalidate_cached(self.id)      # Server bumps the version, so any cached copy is now out of date
+        return result
         # https://demo.thingsboard.io/swagger-ui.html#/device-controller/saveDeviceUsingPOST
 
 
+def telemetry_params(
+    device_id: str,
+    keys: Union[str, Iterable[str]],
+    start_ts: Optional[Timestamp] = None,
+    end_ts: Optional[Timestamp] = None,
+    interval: Optional[int] = None,
+    limit: int = 100,
+    agg: AggregationType = AggregationType.NONE,
+    order_by: Optional[str] = None,
+) -> str:
+    """
+    Builds the url params for a timeseries request; shared by Device.get_telemetry() and the async client.
+    order_by: "ASC" or "DESC" (the server's default); only honored when agg is NONE
+    """
+    if not isinstance(keys, str):
+        keys = ",".join(keys)
+
+    # Don't include these in the signature because datetime.now() gets evaluated once when function is first called, then reused after that.
+    # It's lame, but it's the way default values are managed in Python.  Blame Guido.
+    # Same principle as this: https://web.archive.org/web/20201002220217/http://effbot.org/zone/default-values.htm
+    if start_ts is None:
+        start_ts = 0
+    if end_ts is None:
+        end_ts = datetime.now()
+
+    start_ts = prepare_ts(start_ts)
+    end_ts = prepare_ts(end_ts)
+
+    # These are all optional parameters, strictly speaking
+    interval_clause = f"&interval={interval}" if interval else ""
+    limit_caluse = f"&limit={limit}" if limit else ""
+    agg_clause = f"&agg={agg.value}"
+    order_clause = f"&orderBy={order_by}" if order_by else ""
+    use_strict_datatypes_clause = "&useStrictDataTypes=true"       # Fixes bug of getting back strings as numbers
+
+    clauses = interval_clause + limit_caluse + agg_clause + order_clause + use_strict_datatypes_clause
+    return f"/api/plugins/telemetry/DEVICE/{device_id}/values/timeseries?keys={keys}&startTs={start_ts}&endTs={end_ts}{clauses}"
+
+
+def get_telemetry_chunked(
+    tbapi: "TbApi",
+    device_id: str,
+    keys: Union[str, Iterable[str]],
+    start_ts: Timestamp,
+    end_ts: Optional[Timestamp] = None,
+    points_per_second: Optional[float] = None,
+    limit: int = 10_000,
+    concurrency: int = 4,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """ Device.get_telemetry_chunked(), for when all you have is the device's id. """
+    keys = keys.split(",") if isinstance(keys, str) else list(keys)
+    start = prepare_ts(start_ts)
+    end = prepare_ts(end_ts if end_ts is not None else datetime.now())
+    points: Dict[str, Dict[int, Dict[str, Any]]] = {key: {} for key in keys}      # key -> ts -> point
+
+    def fetch(window: tuple[List[str], int, int]) -> Dict[str, List[Dict[str, Any]]]:
+        window_keys, window_start, window_end = window
+        params = telemetry_params(device_id, window_keys, window_start, window_end, limit=limit)
+        return tbapi.get(params, f"Error retrieving telemetry for device '{device_id}' with params '{params}'")
+
+    if points_per_second:
+        windows = _split_window(keys, start, end, int(CHUNK_FILL * limit / points_per_second * 1000))
+    else:
+        windows = [(keys, start, end)]
+
+    while windows:
+        next_windows: List[tuple[List[str], int, int]] = []
+
+        for (window_keys, window_start, window_end), result in zip(windows, _map_concurrent(fetch, windows, concurrency)):
+            full_keys: List[str] = []
+            complete_from = window_start
+
+            for key in window_keys:
+                values = result.get(key, [])
+                for point in values:
+                    points[key][point["ts"]] = point
+
+                if len(values) >= limit:        # Probably truncated: we have the newest limit points, but there may be more
+                    full_keys.append(key)
+                    complete_from = max(complete_from, min(point["ts"] for point in values))
+
+            # Every key is complete from complete_from on; refetch the rest in windows sized by the busiest key's density
+            if full_keys and complete_from > window_start:
+                next_windows += _split_window(full_keys, window_start, complete_from, int(CHUNK_FILL * (window_end - complete_from)))
+
+        windows = next_windows
+
+    return {key: sorted(by_ts.values(), key=lambda point: point["ts"], reverse=True) for key, by_ts in points.items() if by_ts}
+
+
+def _split_window(keys: List[str], start: int, end: int, size: int) -> List[tuple[List[str], int, int]]:
+    """ Splits [start, end) into windows of about size ms, but no more than MAX_WINDOWS_PER_SPLIT of them. """
+    size = max(size, 1, -(-(end - start) // MAX_WINDOWS_PER_SPLIT))
+    return [(keys, window_start, min(window_start + size, end)) for window_start in range(start, end, size)]
+
+
 def prepare_ts(ts: Timestamp) -> int:
     if isinstance(ts, datetime):
         ts = ts.timestamp() * 1000
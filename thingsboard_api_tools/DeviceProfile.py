@@ -15,7 +15,7 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from typing import  Any
+from typing import  Any, ClassVar
 from pydantic import Field
 
 try:
@@ -34,6 +34,13 @@ class DeviceProfileInfo(TbObject, HasAttributes):
     transport_type: str = Field(alias="transportType")          # Default appears to be "DEFAULT"
     default_dashboard_id: Id | None = Field(alias="defaultDashboardId")
 
+    server_sort_properties: ClassVar[dict[str, str]] = {
+        "name": "name",
+        "type": "type",
+        "transport_type": "transportType",
+        "created_time": "createdTime",
+    }
+
 
 class DeviceProfile(DeviceProfileInfo):
     tenant_id: Id | None = Field(alias="tenantId")
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .TbModel import TbObject
+
+
+class EntityCache:
+    """
+    An identity map for objects fetched by id: while an entry is fresh, TbApi's get_*_by_id() methods return the very
+    same instance rather than asking the server again.  Entries expire after a per-type TTL, and the least recently used
+    ones are dropped once the cache is full.  Models evict their own entries when they are updated or deleted through
+    this library; changes made by anyone else only show up once the entry expires (or after invalidate()).
+
+    Since instances are shared, changes you make to one are seen by everyone who fetched it.  Attach one to a TbApi
+    with tbapi.entity_cache = EntityCache().
+    """
+
+    def __init__(self, max_size: int = 10_000, default_ttl: float = 5 * 60, ttls: dict[str, float] | None = None):
+        """
+        max_size: Most objects to hold; the least recently used are evicted beyond this
+        default_ttl: Seconds an object stays fresh, unless its type is listed in ttls
+        ttls: Seconds an object stays fresh, by class name, e.g. {"Customer": 3600, "Device": 30}.  Use 0 to never cache a type.
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.ttls: dict[str, float] = ttls or {}
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple[type, str], tuple[float, "TbObject"]] = OrderedDict()     # (type, guid) -> (expires, obj)
+        self._types_by_guid: dict[str, set[type]] = {}      # So invalidate() doesn't have to scan everything
+        self._lock = threading.Lock()
+
+
+    def get(self, object_type: type, guid: str) -> Any:
+        """ Returns the cached object_type with the given guid, or None if we don't have a fresh one. """
+        key = (object_type, guid)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+
+    def put(self, obj: "TbObject") -> None:
+        """ Adds obj to the cache, replacing any object of the same type and id. """
+        object_type = type(obj)
+        ttl = self.ttls.get(object_type.__name__, self.default_ttl)
+        if ttl <= 0:
+            return
+
+        key = (object_type, obj.id.id)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, obj)
+            self._entries.move_to_end(key)
+            self._types_by_guid.setdefault(key[1], set()).add(object_type)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+
+    def invalidate(self, guid: str) -> None:
+        """ Drops every cached object with this id, whatever its type (e.g. both a Dashboard and its DashboardHeader). """
+        with self._lock:
+            for object_type in self._types_by_guid.pop(guid, ()):
+                del self._entries[(object_type, guid)]
+
+
+    def clear(self) -> None:
+        """ Drops everything. """
+        with self._lock:
+            self._entries.clear()
+            self._types_by_guid.clear()
+
+
+    def _remove(self, key: tuple[type, str]) -> None:
+        """ Caller must hold the lock. """
+        del self._entries[key]
+
+        types = self._types_by_guid[key[1]]
+        types.discard(key[0])
+        if not types:
+            del self._types_by_guid[key[1]]
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,190 @@
+from typing import Any, Iterable
+from datetime import datetime
+from pydantic import field_validator
+
+from .TbModel import TbModel, Id
+
+
+class EntityKeyType:
+    """ What kind of value a key in an EntityDataQuery refers to. """
+    ENTITY_FIELD = "ENTITY_FIELD"           # name, label, type, createdTime, etc.
+    TIME_SERIES = "TIME_SERIES"
+    ATTRIBUTE = "ATTRIBUTE"                 # Any scope
+    CLIENT_ATTRIBUTE = "CLIENT_ATTRIBUTE"
+    SHARED_ATTRIBUTE = "SHARED_ATTRIBUTE"
+    SERVER_ATTRIBUTE = "SERVER_ATTRIBUTE"
+
+
+_ATTRIBUTE_KEY_TYPES = (EntityKeyType.ATTRIBUTE, EntityKeyType.CLIENT_ATTRIBUTE, EntityKeyType.SHARED_ATTRIBUTE, EntityKeyType.SERVER_ATTRIBUTE)
+
+
+class EntityDataQuery:
+    """
+    Builds a query for TB's entity data query API, which returns entity fields, latest telemetry, and attributes for
+    many entities in one paged request.  Start with one of the filter constructors, then chain the rest:
+
+        query = (EntityDataQuery.devices("thermostat")
+                 .with_fields("name", "label")
+                 .with_telemetry("temperature")
+                 .with_attributes("firmware", key_type=EntityKeyType.SHARED_ATTRIBUTE)
+                 .where("temperature", "GREATER", 30, key_type=EntityKeyType.TIME_SERIES)
+                 .order_by("name"))
+
+        for record in tbapi.query_entities(query):
+            print(record.fields["name"], record.telemetry["temperature"].value)
+
+    Keys are TB's names (e.g. "createdTime"), not our model field names.  All values come back from the server as strings.
+    """
+
+    def __init__(self, entity_filter: dict[str, Any]):
+        """ entity_filter: Raw TB entity filter; the constructors below cover the common cases. """
+        self.entity_filter = entity_filter
+        self.entity_fields: list[str] = []
+        self.latest_values: list[tuple[str, str]] = []     # (key_type, key)
+        self.key_filters: list[dict[str, Any]] = []
+        self.sort_order: dict[str, Any] | None = None
+        self.text_search: str | None = None
+        self.page_size = 1000
+
+
+    @classmethod
+    def devices(cls, device_types: str | Iterable[str] | None = None, name_filter: str = "") -> "EntityDataQuery":
+        """ All devices, or those of the given type(s).  name_filter limits results to names starting with it. """
+        if device_types is None:
+            if name_filter:
+                return cls({"type": "entityName", "entityType": "DEVICE", "entityNameFilter": name_filter})
+            return cls.entity_type("DEVICE")
+
+        types = [device_types] if isinstance(device_types, str) else list(device_types)
+        return cls({"type": "deviceType", "deviceTypes": types, "deviceNameFilter": name_filter})
+
+
+    @classmethod
+    def entity_type(cls, entity_type: str) -> "EntityDataQuery":
+        """ Every entity of a type, e.g. EntityType.CUSTOMER """
+        return cls({"type": "entityType", "entityType": entity_type})
+
+
+    @classmethod
+    def entity_list(cls, entity_type: str, ids: Iterable[Id | str]) -> "EntityDataQuery":
+        """ Specific entities of one type """
+        guids = [entity_id.id if isinstance(entity_id, Id) else entity_id for entity_id in ids]
+        return cls({"type": "entityList", "entityType": entity_type, "entityList": guids})
+
+
+    def with_fields(self, *keys: str) -> "EntityDataQuery":
+        """ Entity fields to return, e.g. "name", "label", "type", "createdTime" """
+        self.entity_fields += keys
+        return self
+
+
+    def with_telemetry(self, *keys: str) -> "EntityDataQuery":
+        """ Telemetry keys to return the latest value of """
+        self.latest_values += [(EntityKeyType.TIME_SERIES, key) for key in keys]
+        return self
+
+
+    def with_attributes(self, *keys: str, key_type: str = EntityKeyType.ATTRIBUTE) -> "EntityDataQuery":
+        """ Attributes to return; key_type picks a scope, or leave it as ATTRIBUTE to take any """
+        if key_type not in _ATTRIBUTE_KEY_TYPES:
+            raise ValueError(f"'{key_type}' is not an attribute key type")
+
+        self.latest_values += [(key_type, key) for key in keys]
+        return self
+
+
+    def where(self, key: str, operation: str, value: str | int | float | bool, key_type: str = EntityKeyType.ENTITY_FIELD) -> "EntityDataQuery":
+        """
+        Only return entities where key compares to value as specified; multiple where()s must all match.
+        operation: For strings: EQUAL, NOT_EQUAL, STARTS_WITH, ENDS_WITH, CONTAINS, NOT_CONTAINS
+                   For numbers: EQUAL, NOT_EQUAL, GREATER, LESS, GREATER_OR_EQUAL, LESS_OR_EQUAL
+                   For bools: EQUAL, NOT_EQUAL
+        """
+        if isinstance(value, bool):         # Check before numbers; bool is a subclass of int
+            value_type = "BOOLEAN"
+            predicate: dict[str, Any] = {"type": "BOOLEAN", "operation": operation, "value": {"defaultValue": value}}
+        elif isinstance(value, (int, float)):
+            value_type = "NUMERIC"
+            predicate = {"type": "NUMERIC", "operation": operation, "value": {"defaultValue": value}}
+        else:
+            value_type = "STRING"
+            predicate = {"type": "STRING", "operation": operation, "value": {"defaultValue": value}, "ignoreCase": False}
+
+        self.key_filters.append({"key": {"type": key_type, "key": key}, "valueType": value_type, "predicate": predicate})
+        return self
+
+
+    def order_by(self, key: str, descending: bool = False, key_type: str = EntityKeyType.ENTITY_FIELD) -> "EntityDataQuery":
+        """ Server-side sort; only one key is supported """
+        self.sort_order = {"key": {"type": key_type, "key": key}, "direction": "DESC" if descending else "ASC"}
+        return self
+
+
+    def search(self, text: str) -> "EntityDataQuery":
+        """ Only return entities whose requested fields contain text """
+        self.text_search = text
+        return self
+
+
+    def with_page_size(self, page_size: int) -> "EntityDataQuery":
+        self.page_size = page_size
+        return self
+
+
+    def to_json(self, page: int = 0) -> dict[str, Any]:
+        """ The request body for the given page """
+        page_link: dict[str, Any] = {"page": page, "pageSize": self.page_size}
+        if self.text_search:
+            page_link["textSearch"] = self.text_search
+        if self.sort_order:
+            page_link["sortOrder"] = self.sort_order
+
+        return {
+            "entityFilter": self.entity_filter,
+            "keyFilters": self.key_filters,
+            "entityFields": [{"type": EntityKeyType.ENTITY_FIELD, "key": key} for key in self.entity_fields],
+            "latestValues": [{"type": key_type, "key": key} for key_type, key in self.latest_values],
+            "pageLink": page_link,
+        }
+
+
+    def count_json(self) -> dict[str, Any]:
+        """ The request body for counting matching entities """
+        return {"entityFilter": self.entity_filter, "keyFilters": self.key_filters}
+
+
+class LatestValue(TbModel):
+    ts: datetime | None
+    value: str | None
+
+
+    @field_validator("ts", mode="before")
+    @classmethod
+    def zero_is_none(cls, ts: Any) -> Any:
+        """ TB reports ts 0 for values that have no timestamp, like entity fields """
+        return None if ts == 0 else ts
+
+
+class EntityDataRecord(TbModel):
+    """ One entity from an EntityDataQuery: whichever fields, telemetry, and attributes were asked for, by key. """
+    entity_id: Id
+    fields: dict[str, str | None]
+    telemetry: dict[str, LatestValue]
+    attributes: dict[str, LatestValue]
+
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "EntityDataRecord":
+        """ Converts one item from the query's "data" list """
+        latest: dict[str, dict[str, Any]] = data.get("latest") or {}
+
+        attributes: dict[str, Any] = {}
+        for key_type in _ATTRIBUTE_KEY_TYPES:
+            attributes |= latest.get(key_type) or {}
+
+        return cls.model_validate({
+            "entity_id": data["entityId"],
+            "fields": {key: value["value"] for key, value in (latest.get(EntityKeyType.ENTITY_FIELD) or {}).items()},
+            "telemetry": latest.get(EntityKeyType.TIME_SERIES) or {},
+            "attributes": attributes,
+        })
@@ -0,0 +1,61 @@
+import json as Json
+import math
+from typing import Any
+
+try:
+    import orjson       # pip install orjson
+except ImportError:
+    orjson = None
+
+
+class JsonCodec:
+    """
+    Turns objects into JSON bytes and back.  TbApi uses one for every request and response body; default_codec() picks
+    the fastest one installed.  To plug in another library, subclass this and set tbapi.json_codec.
+
+    Whichever is installed, a body should come out the same or not at all: NaN and infinities raise ValueError (they
+    aren't valid JSON, and the server rejects them), and types JSON has no form for, like datetimes, raise TypeError.
+    """
+    name = "json"
+
+
+    def dumps(self, obj: Any) -> bytes:
+        return Json.dumps(obj, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode()
+
+
+    def loads(self, data: bytes | str) -> Any:
+        return Json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """ Several times faster than the standard library, in both directions. """
+    name = "orjson"
+
+
+    def dumps(self, obj: Any) -> bytes:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS     # type: ignore
+        data = orjson.dumps(obj, option=options)       # type: ignore
+
+        # orjson quietly writes NaN and infinities as null, so if it wrote any nulls, check they were really None
+        if b"null" in data and _has_non_finite(obj):
+            raise ValueError("Out of range float values are not JSON compliant")
+        return data
+
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)       # type: ignore
+
+
+def _has_non_finite(obj: Any) -> bool:
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    return False
+
+
+def default_codec() -> JsonCodec:
+    """ orjson if it's installed, otherwise the standard library """
+    return OrjsonCodec() if orjson is not None else JsonCodec()
@@ -0,0 +1,129 @@
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+
+class _TypeIndex:
+    """ What NameIndex knows about one model type. """
+
+    def __init__(self):
+        self.by_name: dict[str, Any] = {}
+        self.name_by_guid: dict[str, str] = {}
+        self.duplicates: dict[str, set[str]] = {}      # Names shared by several objects -> their guids; lookups of these raise
+        self.newest_created_time: Any = None
+        self.built_at: float | None = None      # None until the first full listing
+        self.refreshed_at: float = 0
+
+
+    def add(self, obj: Any) -> None:
+        self._drop_name(obj.id.id)      # In case it was renamed
+        self.by_name[obj.name] = obj
+        self.name_by_guid[obj.id.id] = obj.name
+
+
+    def forget(self, guid: str) -> None:
+        self._drop_name(guid)
+
+        for shared_name, guids in list(self.duplicates.items()):
+            guids.discard(guid)
+            if len(guids) < 2:
+                del self.duplicates[shared_name]
+
+
+    def _drop_name(self, guid: str) -> None:
+        name = self.name_by_guid.pop(guid, None)
+        obj = self.by_name.get(name) if name is not None else None
+        if obj is not None and obj.id.id == guid:
+            del self.by_name[obj.name]
+
+
+class NameIndex:
+    """
+    Lets TbApi's get_device_by_name(), get_customer_by_name(), and get_device_profile_by_name() resolve names with a
+    dictionary lookup instead of a textSearch query per call.  The first lookup for a type lists every object of that
+    type; after that, lookups made more than max_age seconds since the last refresh first fetch just the objects created
+    since then (newest first, so usually a single small page).  Every rebuild_after seconds the whole listing is reloaded,
+    which is how renames and deletions made outside this library get picked up.
+
+    Names not in the index are looked up on the server as before (and added if found), unless trust_misses is set.  As
+    with the server lookups, names shared by several objects raise an exception rather than picking one.
+    Attach one to a TbApi with tbapi.name_index = NameIndex().
+    """
+
+    def __init__(self, max_age: float = 60, rebuild_after: float = 60 * 60, trust_misses: bool = False):
+        """
+        max_age: Seconds a lookup will trust the index before checking the server for newly created objects
+        rebuild_after: Seconds between full reloads of each type's listing
+        trust_misses: If True, names not in the index are reported as not found without asking the server.  Fastest, but
+            objects renamed by someone else since the last rebuild won't be found under their new names.
+        """
+        self.max_age = max_age
+        self.rebuild_after = rebuild_after
+        self.trust_misses = trust_misses
+
+        self._indexes: dict[type, _TypeIndex] = {}
+        self._lock = threading.Lock()
+
+
+    def lookup(self, object_type: type, name: str, newest_first: Callable[[], Iterable[Any]]) -> Any:
+        """
+        Returns the object_type with this exact name, or None if it isn't in the index; raises if several have it.
+        newest_first should list every object_type, sorted by created time, newest first; it's called whenever the index
+        needs refreshing.
+        """
+        with self._lock:        # Held while refreshing, so concurrent lookups wait for one refresh rather than each doing their own
+            index = self._indexes.setdefault(object_type, _TypeIndex())
+            now = time.monotonic()
+
+            if index.built_at is None or now - index.built_at > self.rebuild_after:
+                index = self._indexes[object_type] = _TypeIndex()
+                self._refresh(index, newest_first)
+                index.built_at = now
+            elif now - index.refreshed_at > self.max_age:
+                self._refresh(index, newest_first)
+
+            index.refreshed_at = now
+
+            if name in index.duplicates:
+                raise Exception(f"multiple matches were found for name {name}")
+            return index.by_name.get(name)
+
+
+    def add(self, obj: Any) -> None:
+        """ Adds or updates obj in the index for its type. """
+        with self._lock:
+            self._indexes.setdefault(type(obj), _TypeIndex()).add(obj)
+
+
+    def forget(self, guid: str) -> None:
+        """ Drops the object with this id from the index, whatever its type. """
+        with self._lock:
+            for index in self._indexes.values():
+                index.forget(guid)
+
+
+    def clear(self) -> None:
+        """ Drops everything; the next lookup of each type reloads its full listing. """
+        with self._lock:
+            self._indexes.clear()
+
+
+    @staticmethod
+    def _refresh(index: _TypeIndex, newest_first: Callable[[], Iterable[Any]]) -> None:
+        """ Adds objects created since the newest one we've seen, or everything if the index is empty. """
+        since = index.newest_created_time
+        newest = since
+
+        for obj in newest_first():
+            if since is not None and obj.created_time is not None and obj.created_time < since:
+                break       # Everything from here on is already in the index
+            if newest is None or (obj.created_time is not None and obj.created_time > newest):
+                newest = obj.created_time
+            if since is None and obj.name in index.by_name:     # Full build: names should be unique, but if not, note it
+                existing = index.by_name[obj.name]
+                if existing != obj:
+                    index.duplicates.setdefault(obj.name, {existing.id.id}).add(obj.id.id)
+                continue
+            index.add(obj)
+
+        index.newest_created_time = newest
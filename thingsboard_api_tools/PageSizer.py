@@ -0,0 +1,55 @@
+import threading
+
+
+class AdaptivePageSizer:
+    """
+    Learns a page size for each paged endpoint from how long its pages take and how big they are: cheap endpoints get
+    bigger pages (fewer round trips), heavy ones get smaller pages (no multi-megabyte responses that time out).
+
+    Sizes move by factors of two, which lets TbApi switch sizes partway through a listing without skipping or repeating
+    items.  Attach one to a TbApi with tbapi.adaptive_paging = AdaptivePageSizer().
+    """
+
+    def __init__(
+        self,
+        min_page_size: int = 25,
+        max_page_size: int = 10_000,
+        target_seconds: float = 1.0,
+        max_bytes: int = 2_000_000,
+    ):
+        """
+        target_seconds: Pages slower than this cause the page size to shrink; pages under half of it let it grow
+        max_bytes: Pages larger than this cause the page size to shrink; pages under half of it let it grow
+        """
+        self.min_page_size = min_page_size
+        self.max_page_size = max_page_size
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+
+        self._sizes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+
+    def page_size(self, endpoint: str, initial: int) -> int:
+        """ Returns the page size we've learned for endpoint, or initial if we haven't seen it yet. """
+        with self._lock:
+            return self._sizes.get(endpoint, initial)
+
+
+    def observe(self, endpoint: str, page_size: int, items: int, num_bytes: int, seconds: float) -> None:
+        """ Record how a page of page_size went; items is how many records actually came back. """
+        if num_bytes > self.max_bytes or seconds > self.target_seconds:
+            new_size = max(self.min_page_size, page_size // 2)
+        elif items == page_size and num_bytes * 2 <= self.max_bytes and seconds * 2 <= self.target_seconds:
+            new_size = min(self.max_page_size, page_size * 2)       # Only grow on full pages; the last page tells us little
+        else:
+            new_size = page_size
+
+        with self._lock:
+            self._sizes[endpoint] = new_size
+
+
+    def reset(self) -> None:
+        """ Forget everything we've learned. """
+        with self._lock:
+            self._sizes.clear()
@@ -0,0 +1,107 @@
+import threading
+import time
+from typing import Callable
+
+
+class EndpointClass:
+    """ The groups of endpoints RateLimiter can limit separately. """
+    ALL = "all"                             # Every request, in addition to its own class
+    TELEMETRY_WRITE = "telemetry_write"
+    TELEMETRY_READ = "telemetry_read"
+    ENTITY = "entity"                       # Everything else: devices, customers, dashboards, etc.
+
+
+class _Bucket:
+    def __init__(self, capacity: float, period: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / period       # Tokens per second
+        self.tokens = capacity              # Can go negative: that's requests that have reserved tokens not yet refilled
+        self.updated = now
+
+
+    def reserve(self, now: float) -> float:
+        """ Takes a token, returning how long the caller must wait before it's theirs. """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0
+
+
+class RateLimiter:
+    """
+    Client-side token buckets that keep our request rate under the server's limits, so parallel work slows down a bit
+    instead of getting 429s.  Limits use Thingsboard's syntax: "100:1,2000:60" means at most 100 requests per second
+    and 2000 per minute.  Each request counts against the ALL limit and the limit for its own EndpointClass:
+
+        limiter = RateLimiter({EndpointClass.ALL: "100:1,2000:60", EndpointClass.TELEMETRY_WRITE: "20:1"})
+
+    One limiter can be shared by any number of TbApis (and AsyncTbApis) using the same tenant; attach it with
+    tbapi.rate_limiter = limiter.
+    """
+
+    def __init__(self, limits: dict[str, str], margin: float = 0.05, clock: Callable[[], float] = time.monotonic):
+        """
+        limits: Thingsboard style limits, keyed by EndpointClass; classes not listed are only held to the ALL limit
+        margin: Fraction of each limit to leave unused.  Requests don't reach the server exactly as spaced here, and
+            the server counts them with its own buckets, so running at 100% would occasionally trip them.
+        clock: Where we get the time; only worth changing for testing
+        """
+        if not 0 <= margin < 1:
+            raise ValueError(f"margin must be at least 0 and less than 1, not {margin}")
+
+        self._clock = clock
+        now = clock()
+        self._buckets: dict[str, list[_Bucket]] = {
+            endpoint_class: [_Bucket(capacity * (1 - margin), period, now) for capacity, period in parse_limits(spec)]
+            for endpoint_class, spec in limits.items()
+        }
+        self._lock = threading.Lock()
+
+
+    def reserve(self, endpoint_class: str) -> float:
+        """
+        Claims a slot for one request of endpoint_class, returning how many seconds to wait before sending it.  Slots
+        are handed out in order, so callers that wait as told will keep the rate right at the limit, less the margin.
+        """
+        buckets = self._buckets.get(EndpointClass.ALL, [])
+        if endpoint_class != EndpointClass.ALL:
+            buckets = buckets + self._buckets.get(endpoint_class, [])
+
+        with self._lock:
+            now = self._clock()
+            return max((bucket.reserve(now) for bucket in buckets), default=0.0)
+
+
+    def acquire(self, endpoint_class: str) -> float:
+        """ Blocks until a request of endpoint_class may be sent; returns the seconds spent waiting. """
+        wait = self.reserve(endpoint_class)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+    @staticmethod
+    def classify(method: str, params: str) -> str:
+        """ Which EndpointClass a request belongs to """
+        if params.startswith("/api/plugins/telemetry/"):
+            return EndpointClass.TELEMETRY_READ if method == "GET" else EndpointClass.TELEMETRY_WRITE
+        if params.startswith("/api/v1/"):           # Device API, which is how telemetry gets sent with a device token
+            return EndpointClass.TELEMETRY_WRITE
+        return EndpointClass.ENTITY
+
+
+def parse_limits(spec: str) -> list[tuple[int, float]]:
+    """ Parses a Thingsboard rate limit like "100:1,2000:60" into [(100, 1.0), (2000, 60.0)]: (requests, seconds) pairs. """
+    limits: list[tuple[int, float]] = []
+
+    for part in spec.split(","):
+        try:
+            capacity, period = part.split(":")
+            limits.append((int(capacity), float(period)))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{spec}': expected something like '100:1,2000:60'") from None
+
+        if limits[-1][0] <= 0 or limits[-1][1] <= 0:
+            raise ValueError(f"Invalid rate limit '{spec}': requests and seconds must be positive")
+
+    return limits
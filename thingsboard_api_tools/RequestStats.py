@@ -0,0 +1,42 @@
+import threading
+
+
+class RequestStats:
+    """
+    Counters describing what TbApi's HTTP layer has been doing, e.g. tbapi.stats["retries"].  Counters that have never
+    been incremented read as 0.  Current counters:
+        requests: Requests sent to the server, including retries
+        retries: Requests repeated under the retry policy; also broken out by reason, e.g. "retries.503" or
+            "retries.ConnectionError"
+        gave_up: Requests that were still failing when we ran out of attempts
+        rate_limited: Requests held back by the rate limiter to stay under the server's limits
+        coalesced: GETs answered by an identical request that was already in flight, rather than sent themselves
+    """
+
+    def __init__(self):
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+
+    def __getitem__(self, name: str) -> int:
+        return self._counts.get(name, 0)
+
+
+    def as_dict(self) -> dict[str, int]:
+        """ A snapshot of all counters """
+        with self._lock:
+            return dict(self._counts)
+
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+    def __str__(self) -> str:
+        return ", ".join(f"{name}: {count}" for name, count in sorted(self.as_dict().items()))
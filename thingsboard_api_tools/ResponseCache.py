@@ -0,0 +1,290 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+GUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+
+CacheKey = tuple[str, str]      # (scope, params)
+
+
+class ResponseCache:
+    """
+    Caches raw GET responses for endpoints that rarely change, so repeated reads (say, by a script run from cron every
+    few minutes) skip the round trip.  Only URLs matching one of the patterns in ttls are cached:
+
+        tbapi.response_cache = ResponseCache({
+            r"/api/deviceProfile": 3600,        # Matches /api/deviceProfiles, /api/deviceProfileInfo/{id}, etc.
+            r"/api/asset/types": 24 * 3600,
+            r"/api/dashboard/info/": 600,
+        }, path="tb_cache.sqlite")
+
+    Patterns are regexes matched against the start of the URL path and query (e.g. "/api/device/{id}"); the first one
+    that matches sets the TTL.  Without a path, entries are kept in memory; with one, they're kept in a SQLite file and
+    survive from one run to the next.  Either way, the least recently used are dropped once there are max_entries.
+
+    Entries are stored per scope, which TbApi sets to its username and server, so a cache (or cache file) shared by
+    clients logged in to different servers or as different users never answers one with the other's responses.
+
+    Writes made through TbApi drop the entries they may have changed: those mentioning any id in the written URL, and
+    those for the same kind of resource (so a POST to /api/device drops /api/device/{id} and /api/tenant/deviceInfos,
+    but not /api/deviceProfiles).  Changes made by anyone else show up when entries expire, or after clear().
+    """
+
+    def __init__(self, ttls: dict[str, float], max_entries: int = 1000, path: str | None = None):
+        """
+        ttls: Seconds to cache responses for, by URL regex; URLs that match none of them aren't cached
+        max_entries: Most responses to hold; the least recently used are evicted beyond this
+        path: SQLite file to keep the cache in; if omitted, it is kept in memory
+        """
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls.items()]
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._store: _MemoryStore | _SqliteStore = _SqliteStore(path) if path else _MemoryStore()
+        self._lock = threading.Lock()
+
+        # Resource names and ids (see _tags()) -> keys of the entries mentioning them, so writes can find the entries
+        # they affect without scanning every key
+        self._index: dict[str, set[CacheKey]] = {}
+        for key in self._store.keys():
+            self._add_to_index(key)
+
+
+    def get(self, params: str, scope: str = "") -> bytes | None:
+        """ The cached response for this URL, or None if we don't have a fresh one. """
+        if self.ttl(params) is None:
+            return None
+
+        key = (scope, params)
+        with self._lock:
+            entry = self._store.get(key)
+
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._delete([key])
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry[1]
+
+
+    def put(self, params: str, content: bytes, scope: str = "") -> None:
+        """ Caches content for this URL, if it matches one of our patterns. """
+        ttl = self.ttl(params)
+        if ttl is None or ttl <= 0:
+            return
+
+        key = (scope, params)
+        with self._lock:
+            evicted = self._store.put(key, time.time() + ttl, content, self.max_entries)
+            self._add_to_index(key)
+            self._remove_from_index(evicted)
+
+
+    def ttl(self, params: str) -> float | None:
+        """ How long responses from this URL are cached for, or None if they aren't. """
+        for pattern, ttl in self.ttls:
+            if pattern.match(params):
+                return ttl
+        return None
+
+
+    def invalidate_for_write(self, params: str, scope: str = "") -> None:
+        """ Drops entries in this scope that a write to this URL may have made stale. """
+        with self._lock:
+            keys = {key for tag in _tags(params) for key in self._index.get(tag, ()) if key[0] == scope}
+            self._delete(list(keys))
+
+
+    def invalidate(self, guid: str) -> None:
+        """ Drops every entry mentioning this id, in any scope. """
+        with self._lock:
+            self._delete(list(self._index.get(guid.lower(), ())))
+
+
+    def clear(self) -> None:
+        """ Drops everything. """
+        with self._lock:
+            self._store.clear()
+            self._index.clear()
+
+
+    def close(self) -> None:
+        """ Closes the SQLite file, if we have one. """
+        with self._lock:
+            self._store.close()
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._store)
+
+
+    def _delete(self, keys: list[CacheKey]) -> None:
+        if keys:
+            self._store.delete(keys)
+            self._remove_from_index(keys)
+
+
+    def _add_to_index(self, key: CacheKey) -> None:
+        for tag in _tags(key[1]):
+            self._index.setdefault(tag, set()).add(key)
+
+
+    def _remove_from_index(self, keys: list[CacheKey]) -> None:
+        for key in keys:
+            for tag in _tags(key[1]):
+                tagged = self._index.get(tag)
+                if tagged is not None:
+                    tagged.discard(key)
+                    if not tagged:
+                        del self._index[tag]
+
+
+def _tags(params: str) -> set[str]:
+    """ What a URL mentions that a write might change: the kinds of resources it refers to, and any (lowercased) ids. """
+    return _resources(params) | {guid.lower() for guid in GUID.findall(params)}
+
+
+def _resources(params: str) -> set[str]:
+    """
+    The kinds of things a URL refers to, e.g. {"customer", "device"} for /api/customer/{id}/deviceInfos.  Plurals and
+    Info variants are folded together so that writes to /api/device match listings from /api/tenant/devices.
+    """
+    resources: set[str] = set()
+
+    for segment in params.split("?")[0].split("/")[2:]:     # Skip the leading "" and "api"
+        if not segment or GUID.fullmatch(segment):
+            continue
+        for suffix in ("Infos", "Info", "s"):
+            if segment.endswith(suffix):
+                segment = segment[:-len(suffix)]
+                break
+        if segment:
+            resources.add(segment)
+
+    return resources
+
+
+class _MemoryStore:
+    def __init__(self):
+        self._entries: OrderedDict[CacheKey, tuple[float, bytes]] = OrderedDict()     # key -> (expires, content)
+
+
+    def get(self, key: CacheKey) -> tuple[float, bytes] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+
+    def put(self, key: CacheKey, expires: float, content: bytes, max_entries: int) -> list[CacheKey]:
+        """ Returns the keys evicted to make room. """
+        self._entries[key] = (expires, content)
+        self._entries.move_to_end(key)
+
+        evicted: list[CacheKey] = []
+        while len(self._entries) > max_entries:
+            evicted.append(self._entries.popitem(last=False)[0])
+        return evicted
+
+
+    def keys(self) -> list[CacheKey]:
+        return list(self._entries)
+
+
+    def delete(self, keys: list[CacheKey]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+    def close(self) -> None:
+        pass
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _SqliteStore:
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)        # ResponseCache serializes access with its lock
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS scoped_responses "
+            "(scope TEXT, params TEXT, expires REAL, used REAL, content BLOB, PRIMARY KEY (scope, params))"
+        )
+        self._db.commit()
+
+        # When entries were last read; written out in one batch before the next eviction rather than on every hit
+        self._used: dict[CacheKey, float] = {}
+
+
+    def get(self, key: CacheKey) -> tuple[float, bytes] | None:
+        row = self._db.execute("SELECT expires, content FROM scoped_responses WHERE scope = ? AND params = ?", key).fetchone()
+        if row is not None:
+            self._used[key] = time.time()
+        return row
+
+
+    def put(self, key: CacheKey, expires: float, content: bytes, max_entries: int) -> list[CacheKey]:
+        """ Returns the keys evicted to make room. """
+        self._used.pop(key, None)
+        self._flush_used()
+        self._db.execute("INSERT OR REPLACE INTO scoped_responses VALUES (?, ?, ?, ?, ?)", (*key, expires, time.time(), content))
+
+        evicted: list[CacheKey] = [
+            (scope, params)
+            for scope, params in self._db.execute(
+                "SELECT scope, params FROM scoped_responses ORDER BY used DESC LIMIT -1 OFFSET ?", (max_entries,)
+            )
+        ]
+        self._db.executemany("DELETE FROM scoped_responses WHERE scope = ? AND params = ?", evicted)
+        self._db.commit()
+        return evicted
+
+
+    def keys(self) -> list[CacheKey]:
+        return [(scope, params) for scope, params in self._db.execute("SELECT scope, params FROM scoped_responses")]
+
+
+    def delete(self, keys: list[CacheKey]) -> None:
+        if keys:
+            for key in keys:
+                self._used.pop(key, None)
+            self._db.executemany("DELETE FROM scoped_responses WHERE scope = ? AND params = ?", keys)
+            self._db.commit()
+
+
+    def clear(self) -> None:
+        self._used.clear()
+        self._db.execute("DELETE FROM scoped_responses")
+        self._db.commit()
+
+
+    def close(self) -> None:
+        self._flush_used()
+        self._db.commit()
+        self._db.close()
+
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM scoped_responses").fetchone()[0]
+
+
+    def _flush_used(self) -> None:
+        if self._used:
+            self._db.executemany(
+                "UPDATE scoped_responses SET used = ? WHERE scope = ? AND params = ?",
+                [(used, *key) for key, used in self._used.items()],
+            )
+            self._used.clear()
@@ -0,0 +1,77 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests TbApi retries, and how long it waits in between.  Connection errors, timeouts, and the
+    statuses in retry_statuses are retried, up to max_attempts tries in all, backing off exponentially with full jitter
+    (or as long as the server's Retry-After header asks, when it sends one).
+
+    GETs and DELETEs are always safe to repeat.  POSTs aren't in general, so they're only retried if retry_post is set,
+    or the call says it's safe (TbApi.post(..., idempotent=True)).
+
+    Attach one to a TbApi with tbapi.retry_policy = RetryPolicy().
+    """
+
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30,
+        retry_statuses: set[int] | None = None,
+        retry_post: bool = False,
+        max_retry_after: float = 120,
+    ):
+        """
+        max_attempts: Most times to try a request, including the first
+        backoff: Longest wait before the first retry, in seconds; doubles for each retry after that
+        max_backoff: Cap on the wait between retries, in seconds
+        retry_statuses: HTTP statuses worth retrying; defaults to 429, 502, 503, and 504
+        retry_post: Retry all POSTs, not just those marked idempotent
+        max_retry_after: Cap on how long we'll honor a Retry-After header for, in seconds
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses: set[int] = retry_statuses if retry_statuses is not None else {
+            HTTPStatus.TOO_MANY_REQUESTS,
+            HTTPStatus.BAD_GATEWAY,
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            HTTPStatus.GATEWAY_TIMEOUT,
+        }
+        self.retry_post = retry_post
+        self.max_retry_after = max_retry_after
+
+
+    def allows(self, method: str, idempotent: bool = False) -> bool:
+        """ Returns True if a request with this method may be retried at all. """
+        return idempotent or method in self.IDEMPOTENT_METHODS or (method == "POST" and self.retry_post)
+
+
+    def delay(self, attempt: int, retry_after: str | None = None) -> float:
+        """ Seconds to wait after the given (1-based) failed attempt; retry_after is the response's Retry-After header. """
+        if retry_after:
+            seconds = _parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.max_retry_after)
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+def _parse_retry_after(value: str) -> float | None:
+    """ Retry-After is either a number of seconds or an HTTP date. """
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
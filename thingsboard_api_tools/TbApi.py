@@ -15,22 +15,42 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from typing import Optional, Any, Union, Type, TypeVar, TYPE_CHECKING
+from typing import Optional, Any, Callable, Generator, Iterable, Iterator, Union, Type, TypeVar, TYPE_CHECKING
 
+import base64
+import gzip
 import json as Json
 import operator
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 from http import HTTPStatus
+from functools import cache
+from pydantic import TypeAdapter
+
+from .PageSizer import AdaptivePageSizer
+from .EntityCache import EntityCache
+from .NameIndex import NameIndex
+from .RetryPolicy import RetryPolicy
+from .RateLimiter import RateLimiter
+from .ResponseCache import ResponseCache
+from .JsonCodec import JsonCodec, default_codec
+from .RequestStats import RequestStats
 
 if TYPE_CHECKING:
     from .Customer import Customer, CustomerId
-    from .Dashboard import Dashboard
-    from .Device import Device
+    from .Dashboard import Dashboard, DashboardHeader
+    from .Device import Device, TelemetryRow, Timestamp
     from .DeviceProfile import DeviceProfile, DeviceProfileInfo
+    from .EntityDataQuery import EntityDataQuery, EntityDataRecord
     from .TbModel import Id, TbObject
 
 MINUTES = 60
+MAX_URL_LENGTH = 2000       # Conservative; proxies and servers commonly refuse URLs much longer than this
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]     # Every encoding urllib3 can decode here: gzip, deflate, and br/zstd if installed
 
 
 class SortOrder:
@@ -39,6 +59,7 @@ class SortOrder:
 
 
 T = TypeVar("T", bound="TbObject")      # T can be any subclass of TbObject
+U = TypeVar("U", "Customer", "Device", "DeviceProfile", "DeviceProfileInfo")      # Models with a name
 SortClause = Optional[Union[str, tuple[str, bool], list[str | tuple[str, bool]]]]
 """
 SortClause:
@@ -55,48 +76,187 @@ SortClause:
 class TbApi:
     NULL_GUID = "13814000-1dd2-11b2-8080-808080808080"      # From EntityId.java in TB codebase
 
-    def __init__(self, url: str, username: str, password: str, token_timeout: float = 10 * MINUTES):
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        token_timeout: float = 10 * MINUTES,
+        token_refresh_margin: float = 1 * MINUTES,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        keep_alive: bool = True,
+    ):
+        """
+        token_timeout: How long to keep using a token, for servers whose tokens don't say when they expire
+        token_refresh_margin: Renew tokens this many seconds before they expire, so in-flight requests don't get 401s
+        pool_connections: Number of per-host connection pools to keep around (one is plenty when talking to a single server)
+        pool_maxsize: Maximum number of connections kept open to each host; raise this if you share a TbApi across many threads
+        keep_alive: Reuse connections between calls; set to False to close each connection after every request
+        """
         self.mothership_url: str = url
         self.username: str = username
         self.password: str = password
         self.token_timeout: float = token_timeout  # In seconds (epoch time, actually)
+        self.token_refresh_margin: float = token_refresh_margin
 
         self.token_time: float = 0
         self.token: str | None = None
+        self.token_expires: float | None = None    # When self.token expires (epoch time), if the token told us
+        self.refresh_token: str | None = None
+        self._token_lock = threading.Lock()        # So that when the token expires, only one thread renews it
 
         self.verbose: bool = False
         self.public_user_id: "CustomerId | None" = None
 
+        # Number of pages get_paged() fetches at once; 1 walks pages one by one.  Keep this <= pool_maxsize.
+        self.paging_concurrency: int = 1
+
+        # Page sizes for paged requests: page_sizes maps an endpoint (or endpoint prefix, e.g. "/api/customers") to a size;
+        # anything not listed uses default_page_size.  Set adaptive_paging to an AdaptivePageSizer to have sizes tuned
+        # automatically, starting from these values.
+        self.default_page_size: int = 100
+        self.page_sizes: dict[str, int] = {}
+        self.adaptive_paging: AdaptivePageSizer | None = None
+
+        # Set to an EntityCache to have get_*_by_id() reuse recently fetched objects instead of asking the server again
+        self.entity_cache: EntityCache | None = None
+
+        # Set to a NameIndex to have get_*_by_name() resolve names locally instead of querying the server every time
+        self.name_index: NameIndex | None = None
+
+        # Set to a RetryPolicy to have failed requests (dropped connections, 503s, etc.) retried rather than raised
+        self.retry_policy: RetryPolicy | None = None
+        self.stats = RequestStats()
+
+        # Set to a RateLimiter to keep requests under the server's rate limits; one limiter can be shared by several TbApis
+        self.rate_limiter: RateLimiter | None = None
+
+        # If True, identical GETs made at the same time (e.g. many threads fetching the same customer) share one request
+        self.coalesce_gets: bool = False
+
+        # Set to a ResponseCache to have GETs of rarely changing endpoints (profiles, types, etc.) answered locally
+        self.response_cache: ResponseCache | None = None
+
+        # Set to a size in bytes to gzip POST bodies at least that big.  The server (or a proxy in front of it) must accept
+        # Content-Encoding: gzip on requests, which Thingsboard doesn't out of the box.
+        self.compress_requests_over: int | None = None
+
+        # Encodes and decodes every request and response body; uses orjson if it's installed
+        self.json_codec: JsonCodec = default_codec()
+        self._in_flight: dict[str, Future[bytes]] = {}
+        self._in_flight_lock = threading.Lock()
+
+        # One pooled session shared by every call made through this TbApi, including those made by the models
+        self.session: requests.Session = TbApi._create_session(pool_connections, pool_maxsize, keep_alive)
+
+
+    @staticmethod
+    def _create_session(pool_connections: int, pool_maxsize: int, keep_alive: bool) -> requests.Session:
+        """ Builds a requests Session with a connection pool sized as specified. """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+
+        return session
+
+
+    def close(self) -> None:
+        """ Closes any pooled connections.  The TbApi remains usable; new connections will be opened as needed. """
+        self.session.close()
+
+
+    def __enter__(self) -> "TbApi":
+        return self
+
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
 
     def get_token(self) -> str:
         """
-        Fetches and return an access token needed by most other methods; caches tokens for reuse
+        Fetches and return an access token needed by most other methods; caches tokens for reuse.  Safe to call from
+        many threads at once: if the token needs renewing, one thread renews it while the others wait and share the result.
         """
         # If we already have a valid token, use it
-        if self.token is not None and time.time() - self.token_time < self.token_timeout:
+        token = self.token
+        if token is not None and self.has_valid_token():
+            return token
+
+        with self._token_lock:
+            if not self.has_valid_token():      # Another thread may have renewed it while we waited for the lock
+                self._renew_token()
+
+            assert self.token
             return self.token
 
-        data = '{"username":"' + self.username + '", "password":"' + self.password + '"}'
+
+    def _renew_token(self) -> None:
+        """
+        Gets a new token, using the refresh token from our last login if we have one, and logging in with our username
+        and password if we don't (or if the server won't accept it).  Caller must hold _token_lock.
+        """
+        data: dict[str, Any] | None = None
+
+        if self.refresh_token:
+            try:
+                data = self._request_token("/api/auth/token", {"refreshToken": self.refresh_token})
+            except requests.HTTPError:
+                data = None         # Refresh token expired or was revoked; fall back to logging in
+
+        if data is None:
+            data = self._request_token("/api/auth/login", {"username": self.username, "password": self.password})
+
+        if not data.get("token"):
+            raise TokenError("No token received from server")
+
+        self.refresh_token = data.get("refreshToken")
+        self.token = data["token"]
+        self.token_expires = _token_expiry(data["token"])
+        self.token_time = time.time()      # Last, so lock-free readers in get_token() never pair the new time with the old token
+
+
+    def _discard_token(self, token: str) -> None:
+        """ The server rejected token; make sure the next get_token() renews it (unless another thread already has). """
+        with self._token_lock:
+            if self.token == token:
+                self.token_expires = None
+                self.token_time = 0
+
+
+    def _request_token(self, endpoint: str, body: dict[str, str]) -> dict[str, Any]:
+        """ Posts body to one of TB's auth endpoints, returning the decoded response. """
         headers = {"Accept": "application/json", "Content-Type": "application/json"}
-        # json = post("/api/auth/login", None, data, "Error requesting token")
 
-        url = self.mothership_url + "/api/auth/login"
+        url = self.mothership_url + endpoint
         try:
-            response = requests.post(url, data=data, headers=headers)
+            response = self.session.post(url, data=Json.dumps(body), headers=headers)
         except requests.ConnectTimeout as ex:
             ex.args = (f"Could not connect to server (url='{url}').  Is it up?", *ex.args)
             raise
 
-
         self.validate_response(response, "Error requesting token")
 
-        self.token = Json.loads(response.text)["token"]
-        if not self.token:
-            raise TokenError("No token received from server")
+        return Json.loads(response.text)
+
+
+    def has_valid_token(self) -> bool:
+        """ Returns True if we have a cached token that can still be used. """
+        if self.token is None:
+            return False
 
-        self.token_time = time.time()
+        if self.token_expires is not None:
+            # Tokens that live for less than twice the margin get renewed halfway through, rather than on every call
+            margin = min(self.token_refresh_margin, (self.token_expires - self.token_time) / 2)
+            return time.time() < self.token_expires - margin
 
-        return self.token
+        return time.time() - self.token_time < self.token_timeout
 
 
     def get_tenant_assets(self):
@@ -106,13 +266,21 @@ class TbApi:
         return self.get_paged("/api/tenant/assets", "Error retrieving assets for tenant")
 
 
+    def iter_tenant_assets(self) -> Generator[dict[str, Any], None, None]:
+        """
+        Generator version of get_tenant_assets(); yields assets page by page as they arrive
+        """
+        for data in self.iter_paged("/api/tenant/assets", "Error retrieving assets for tenant"):
+            yield from data
+
+
     def get_tenant_devices(self, sort_by: SortClause = None):
         """
         Returns a list of all devices for current tenant
         """
         from .Device import Device
 
-        all_results = self.get_paged("/api/tenant/deviceInfos", "Error retrieving devices for tenant")
+        all_results = self.get_paged(_with_server_sort("/api/tenant/deviceInfos", sort_by, Device), "Error retrieving devices for tenant")
         return self.tb_objects_from_list(all_results, Device, sort_by)
 
 
@@ -161,10 +329,20 @@ class TbApi:
         """
         from .Dashboard import DashboardHeader
 
-        all_results = self.get_paged("/api/tenant/dashboards", "Error fetching list of all dashboards")
+        all_results = self.get_paged(_with_server_sort("/api/tenant/dashboards", sort_by, DashboardHeader), "Error fetching list of all dashboards")
         return self.tb_objects_from_list(all_results, DashboardHeader, sort_by)
 
 
+    def iter_all_dashboard_headers(self, sort_by: SortClause = None) -> Generator["DashboardHeader", None, None]:
+        """
+        Generator version of get_all_dashboard_headers(); yields dashboards page by page as they arrive
+        sort_by: Done server-side; see iter_tb_objects()
+        """
+        from .Dashboard import DashboardHeader
+
+        return self.iter_tb_objects("/api/tenant/dashboards", "Error fetching list of all dashboards", DashboardHeader, sort_by)
+
+
     def get_dashboard_headers_by_name(self, dash_name_prefix: str):
         """
         Returns a list of all dashes starting with the specified name
@@ -174,12 +352,7 @@ class TbApi:
         url = f"/api/tenant/dashboards?textSearch={dash_name_prefix}"
         objs = self.get_paged(url, f"Error retrieving dashboards starting with '{dash_name_prefix}'")
 
-        dashes: list[DashboardHeader] = []
-
-        for obj in objs:
-            dashes.append(DashboardHeader.model_validate(obj | {"tbapi": self}))
-
-        return dashes
+        return self.tb_objects_from_list(objs, DashboardHeader)
 
 
     def get_dashboard_by_name(self, dash_name: str):
@@ -207,8 +380,20 @@ class TbApi:
             dash_id = dash_id.id
         # otherwise, assume dash_id is a guid
 
+        cached = self._cached_entity(DashboardHeader, dash_id)
+        if cached is not None:
+            return cached
+
         obj = self.get(f"/api/dashboard/info/{dash_id}", f"Error retrieving dashboard for '{dash_id}'")
-        return DashboardHeader.model_validate(obj | {"tbapi": self})
+        return self._cache_entity(DashboardHeader.model_validate(obj | {"tbapi": self}))
+
+
+    def get_dashboard_headers_by_ids(self, dash_ids: Iterable[Union["Id", str]], concurrency: int = 8) -> list[Optional["DashboardHeader"]]:
+        """
+        Returns a DashboardHeader for each id in dash_ids, in the same order, with None for ids that don't exist.
+        Dashboards are fetched concurrency at a time (keep this <= pool_maxsize).
+        """
+        return self._get_by_ids(self.get_dashboard_header_by_id, dash_ids, concurrency)
 
 
     def create_customer(
@@ -269,8 +454,39 @@ class TbApi:
         if cust_id == TbApi.NULL_GUID:
             return None
 
+        cached = self._cached_entity(Customer, cust_id)
+        if cached is not None:
+            return cached
+
         obj = self.get(f"/api/customer/{cust_id}", f"Could not retrieve Customer with id '{cust_id}'")
-        return Customer.model_validate(obj | {"tbapi": self})
+        return self._cache_entity(Customer.model_validate(obj | {"tbapi": self}))
+
+
+    def get_customers_by_ids(self, cust_ids: Iterable[Union["CustomerId", "Id", str]]) -> list[Optional["Customer"]]:
+        """
+        Returns a Customer for each id in cust_ids, in the same order, with None for ids that don't exist (or are the
+        NULL_GUID).  Uses the server's multi-id endpoint, so this takes one request per ~50 ids.
+        """
+        from .Customer import Customer, CustomerId
+        from .TbModel import Id
+
+        guids = [cust_id.id.id if isinstance(cust_id, CustomerId) else cust_id.id if isinstance(cust_id, Id) else cust_id for cust_id in cust_ids]
+
+        found: dict[str, Customer] = {}
+        wanted: list[str] = []
+        for guid in dict.fromkeys(guids):       # Dedupe, keeping order
+            cached = self._cached_entity(Customer, guid)
+            if cached is not None:
+                found[guid] = cached
+            elif guid != TbApi.NULL_GUID:
+                wanted.append(guid)
+
+        for chunk in _chunk_ids(self.mothership_url + "/api/customers?customerIds=", wanted):
+            cust_datas = self.get(f"/api/customers?customerIds={','.join(chunk)}", "Error retrieving customers by id")
+            for customer in self.tb_objects_from_list(cust_datas, Customer):
+                found[customer.id.id] = self._cache_entity(customer)
+
+        return [found.get(guid) for guid in guids]
 
 
     def get_customers_by_name(self, cust_name_prefix: str, sort_by: SortClause = None):
@@ -279,7 +495,7 @@ class TbApi:
         """
         from .Customer import Customer
 
-        cust_datas = self.get_paged(f"/api/customers?textSearch={cust_name_prefix}", f"Error retrieving customers with names starting with '{cust_name_prefix}'")
+        cust_datas = self.get_paged(_with_server_sort(f"/api/customers?textSearch={cust_name_prefix}", sort_by, Customer), f"Error retrieving customers with names starting with '{cust_name_prefix}'")
 
         for cust_data in cust_datas:
             # Sometimes this comes in as a dict, sometimes as a string.  Not sure why.
@@ -293,8 +509,10 @@ class TbApi:
         """
         Returns a customer with the specified name, or None if we can't find one
         """
-        customers = self.get_customers_by_name(cust_name)
-        return _exact_match_or_none(cust_name, customers)
+        from .Customer import Customer
+
+        newest_first = self._newest_first(Customer, "/api/customers", "Error fetching list of all customers")
+        return self._find_by_name(Customer, cust_name, newest_first, self.get_customers_by_name)
 
 
     def get_all_customers(self, sort_by: SortClause = None):
@@ -303,17 +521,27 @@ class TbApi:
         """
         from .Customer import Customer
 
-        all_results = self.get_paged("/api/customers", "Error fetching list of all customers")
+        all_results = self.get_paged(_with_server_sort("/api/customers", sort_by, Customer), "Error fetching list of all customers")
         return self.tb_objects_from_list(all_results, Customer, sort_by)
 
 
+    def iter_all_customers(self, sort_by: SortClause = None) -> Generator["Customer", None, None]:
+        """
+        Generator version of get_all_customers(); yields customers page by page as they arrive
+        sort_by: Done server-side; see iter_tb_objects()
+        """
+        from .Customer import Customer
+
+        return self.iter_tb_objects("/api/customers", "Error fetching list of all customers", Customer, sort_by)
+
+
     def get_all_tenants(self, sort_by: SortClause = None):
         """
         Return a list of all tenants in the system
         """
         from .Tenant import Tenant
 
-        all_results = self.get_paged("/api/tenants", "Error fetching list of all tenants")
+        all_results = self.get_paged(_with_server_sort("/api/tenants", sort_by, Tenant), "Error fetching list of all tenants")
         return self.tb_objects_from_list(all_results, Tenant, sort_by)
 
 
@@ -370,15 +598,84 @@ class TbApi:
             device_id = device_id.id
         # otherwise, assume device_id is a guid
 
+        cached = self._cached_entity(Device, device_id)
+        if cached is not None:
+            return cached
+
         obj = self.get(f"/api/device/info/{device_id}", f"Could not retrieve Device with id '{device_id}'")
 
         # This hack is to fix a bug in TB 3.2 (and probably earlier) where customer_id comes back with NULL_GUID
         if obj["customerId"]["id"] == TbApi.NULL_GUID:
             device = self.get_device_by_name(obj["name"])
             assert device
-            return device
+            return self._cache_entity(device)
+
+        return self._cache_entity(Device(self, **obj))
+
+
+    def get_devices_by_ids(self, device_ids: Iterable[Union["Id", str]], concurrency: int = 8) -> list[Optional["Device"]]:
+        """
+        Returns a Device for each id in device_ids, in the same order, with None for ids that don't exist.  Devices are
+        fetched concurrency at a time (keep this <= pool_maxsize).  TB's multi-id device endpoint returns plain Devices,
+        which lack fields our Device model needs (customerIsPublic, active), so we can't use it here.
+        """
+        return self._get_by_ids(self.get_device_by_id, device_ids, concurrency)
+
+
+    def get_fleet_telemetry(
+        self,
+        devices: Iterable[Union["Device", "Id", str]],
+        keys: Union[str, Iterable[str]],
+        start_ts: "Timestamp",
+        end_ts: Optional["Timestamp"] = None,
+        concurrency: int = 8,
+        limit: int = 10_000,
+    ) -> dict[str, dict[str, list[dict[str, Any]]]]:
+        """
+        Fetches the same keys over the same time range for many devices, returning {device guid: telemetry}, where each
+        device's telemetry is in Device.get_telemetry()'s shape ({} if it has no points).  Every point in the range is
+        returned, via get_telemetry_chunked().  Devices are fetched concurrency at a time (keep this <= pool_maxsize);
+        the requests go through rate_limiter and retry_policy like any others, if those are set.
+        """
+        from .Device import Device, get_telemetry_chunked, prepare_ts
+        from .TbModel import Id
+
+        guids = list(dict.fromkeys(
+            device.id.id if isinstance(device, Device) else device.id if isinstance(device, Id) else device for device in devices
+        ))
+        keys = keys.split(",") if isinstance(keys, str) else list(keys)       # keys may be a one-shot iterable; every device needs it
+        start = prepare_ts(start_ts)
+        end = prepare_ts(end_ts) if end_ts is not None else int(time.time() * 1000)      # The same window for every device
 
-        return Device(self, **obj)
+        def fetch(guid: str) -> dict[str, list[dict[str, Any]]]:
+            return get_telemetry_chunked(self, guid, keys, start, end, limit=limit, concurrency=1)
+
+        return dict(zip(guids, _map_concurrent(fetch, guids, concurrency)))
+
+
+    def get_fleet_telemetry_rows(
+        self,
+        devices: Iterable[Union["Device", "Id", str]],
+        keys: Union[str, Iterable[str]],
+        start_ts: "Timestamp",
+        end_ts: Optional["Timestamp"] = None,
+        concurrency: int = 8,
+        limit: int = 10_000,
+    ) -> list["TelemetryRow"]:
+        """
+        get_fleet_telemetry() as a single long-format table: a TelemetryRow(device_id, key, ts, value) per point, by
+        device (in the order given), then key, then time, oldest first.  pandas.DataFrame(rows) makes a frame of it.
+        """
+        from .Device import TelemetryRow
+
+        fleet = self.get_fleet_telemetry(devices, keys, start_ts, end_ts, concurrency, limit)
+
+        return [
+            TelemetryRow(guid, key, point["ts"], point["value"])
+            for guid, telemetry in fleet.items()
+            for key, points in telemetry.items()
+            for point in reversed(points)
+        ]
 
 
     def get_devices_by_name(self, device_name_prefix: str, sort_by: SortClause = None):
@@ -387,22 +684,25 @@ class TbApi:
         """
         from .Device import Device
 
-        data = self.get_paged(f"/api/tenant/deviceInfos?textSearch={device_name_prefix}", f"Error fetching devices with name matching '{device_name_prefix}'")
+        data = self.get_paged(_with_server_sort(f"/api/tenant/deviceInfos?textSearch={device_name_prefix}", sort_by, Device), f"Error fetching devices with name matching '{device_name_prefix}'")
         return self.tb_objects_from_list(data, Device, sort_by)
 
 
     def get_device_by_name(self, device_name: str | None):
         """ Returns a device with the specified name, or None if we can't find one """
+        from .Device import Device
+
         if device_name is None:     # Occasionally helpful
             return None
-        devices = self.get_devices_by_name(device_name)
-        return _exact_match_or_none(device_name, devices)
+
+        newest_first = self._newest_first(Device, "/api/tenant/deviceInfos", "Error fetching list of all Devices")
+        return self._find_by_name(Device, device_name, newest_first, self.get_devices_by_name)
 
 
     def get_devices_by_type(self, device_type: str, sort_by: SortClause = None):
         from .Device import Device
 
-        data = self.get(f"/api/tenant/deviceInfos?pageSize=99999&page=0&type={device_type}", f"Error fetching devices with type '{device_type}'")["data"]
+        data = self.get(_with_server_sort(f"/api/tenant/deviceInfos?pageSize=99999&page=0&type={device_type}", sort_by, Device), f"Error fetching devices with type '{device_type}'")["data"]
         return self.tb_objects_from_list(data, Device, sort_by)
 
 
@@ -413,21 +713,25 @@ class TbApi:
         """
         from .Device import Device
 
-        if is_active == True:       # noqa: E712
-            active_clause = "?active=true"
-        elif is_active == False:    # noqa: E712
-            active_clause = "?active=false"
-        else:
-            active_clause = ""
-
-        all_results = self.get_paged(f"/api/tenant/deviceInfos{active_clause}", "Error fetching list of all Devices")
+        all_results = self.get_paged(_with_server_sort(f"/api/tenant/deviceInfos{_active_clause(is_active)}", sort_by, Device), "Error fetching list of all Devices")
         return self.tb_objects_from_list(all_results, Device, sort_by)
 
 
+    def iter_all_devices(self, is_active: Optional[bool] = None, sort_by: SortClause = None) -> Generator["Device", None, None]:
+        """
+        Generator version of get_all_devices(); yields devices page by page as they arrive
+        is_active: Filter by active status if specified
+        sort_by: Done server-side; see iter_tb_objects()
+        """
+        from .Device import Device
+
+        return self.iter_tb_objects(f"/api/tenant/deviceInfos{_active_clause(is_active)}", "Error fetching list of all Devices", Device, sort_by)
+
+
     def get_all_device_profiles(self, sort_by: SortClause = None):
         from .Device import DeviceProfile
 
-        all_results = self.get_paged("/api/deviceProfiles", "Error fetching list of all DeviceProfiles")
+        all_results = self.get_paged(_with_server_sort("/api/deviceProfiles", sort_by, DeviceProfile), "Error fetching list of all DeviceProfiles")
         return self.tb_objects_from_list(all_results, DeviceProfile, sort_by)
 
 
@@ -443,29 +747,35 @@ class TbApi:
             device_profile_id = device_profile_id.id
         # otherwise, assume device_profile_id is a guid
 
+        cached = self._cached_entity(DeviceProfile, device_profile_id)
+        if cached is not None:
+            return cached
+
         obj = self.get(f"/api/deviceProfile/{device_profile_id}", f"Could not retrieve DeviceProfile with id '{device_profile_id}'")
 
-        return DeviceProfile(tbapi=self, **obj)
+        return self._cache_entity(DeviceProfile(tbapi=self, **obj))
 
 
     def get_device_profiles_by_name(self, device_profile_name_prefix: str, sort_by: SortClause = None):
         """ Returns a list of all DeviceProfiles starting with the specified name """
         from .DeviceProfile import DeviceProfile
 
-        data = self.get_paged(f"/api/deviceProfiles?textSearch={device_profile_name_prefix}", f"Error fetching DeviceProfiles with name matching '{device_profile_name_prefix}'")
+        data = self.get_paged(_with_server_sort(f"/api/deviceProfiles?textSearch={device_profile_name_prefix}", sort_by, DeviceProfile), f"Error fetching DeviceProfiles with name matching '{device_profile_name_prefix}'")
         return self.tb_objects_from_list(data, DeviceProfile, sort_by)
 
 
     def get_device_profile_by_name(self, device_profile_name: str):
         """ Returns a DeviceProfile with the specified name, or None if we can't find one """
-        device_profiles = self.get_device_profiles_by_name(device_profile_name)
-        return _exact_match_or_none(device_profile_name, device_profiles)
+        from .DeviceProfile import DeviceProfile
+
+        newest_first = self._newest_first(DeviceProfile, "/api/deviceProfiles", "Error fetching list of all DeviceProfiles")
+        return self._find_by_name(DeviceProfile, device_profile_name, newest_first, self.get_device_profiles_by_name)
 
 
     def get_all_device_profile_infos(self, sort_by: SortClause = None):
         from .DeviceProfile import DeviceProfileInfo
 
-        all_results = self.get_paged("/api/deviceProfileInfos", "Error fetching list of all DeviceProfileInfos")
+        all_results = self.get_paged(_with_server_sort("/api/deviceProfileInfos", sort_by, DeviceProfileInfo), "Error fetching list of all DeviceProfileInfos")
         return self.tb_objects_from_list(all_results, DeviceProfileInfo, sort_by)
 
 
@@ -481,9 +791,13 @@ class TbApi:
             device_profile_info_id = device_profile_info_id.id
         # otherwise, assume device_profile_info_id is a guid
 
+        cached = self._cached_entity(DeviceProfileInfo, device_profile_info_id)
+        if cached is not None:
+            return cached
+
         obj = self.get(f"/api/deviceProfileInfo/{device_profile_info_id}", f"Could not retrieve DeviceProfileInfo with id '{device_profile_info_id}'")
 
-        return DeviceProfileInfo(tbapi=self, **obj)
+        return self._cache_entity(DeviceProfileInfo(tbapi=self, **obj))
 
 
     def get_device_profile_infos_by_name(self, device_profile_info_name_prefix: str, sort_by: SortClause = None):
@@ -492,7 +806,7 @@ class TbApi:
         """
         from .DeviceProfile import DeviceProfileInfo
 
-        data = self.get_paged(f"/api/deviceProfileInfos?textSearch={device_profile_info_name_prefix}", f"Error fetching DeviceProfileInfos with name matching '{device_profile_info_name_prefix}'")
+        data = self.get_paged(_with_server_sort(f"/api/deviceProfileInfos?textSearch={device_profile_info_name_prefix}", sort_by, DeviceProfileInfo), f"Error fetching DeviceProfileInfos with name matching '{device_profile_info_name_prefix}'")
         return self.tb_objects_from_list(data, DeviceProfileInfo, sort_by)
 
 
@@ -535,14 +849,144 @@ class TbApi:
         return self.get_current_user().tenant_id
 
 
+    def query_entities(self, query: "EntityDataQuery") -> Generator["EntityDataRecord", None, None]:
+        """
+        Runs an EntityDataQuery, yielding a record per matching entity as pages arrive.  One request per page gets the
+        fields, latest telemetry, and attributes the query asks for, for every entity on that page.
+        """
+        from .EntityDataQuery import EntityDataRecord
+
+        page = 0
+        while True:
+            resp = self.post("/api/entitiesQuery/find", query.to_json(page), "Error running entity data query", idempotent=True)
+            for data in resp["data"]:
+                yield EntityDataRecord.from_json(data)
+
+            if not resp["hasNext"]:
+                return
+            page += 1
+
+
+    def count_entities(self, query: "EntityDataQuery") -> int:
+        """ Number of entities an EntityDataQuery would return """
+        return self.post("/api/entitiesQuery/count", query.count_json(), "Error counting entity data query", idempotent=True)     # type: ignore
+
+
+    def invalidate_cached(self, entity_id: Union["Id", str]) -> None:
+        """
+        Drops any objects with this id from entity_cache, name_index, and response_cache, if we have them.  Models call
+        this from update() and delete(); call it yourself if you change an entity some other way.
+        """
+        from .TbModel import Id
+
+        guid = entity_id.id if isinstance(entity_id, Id) else entity_id
+
+        if self.entity_cache is not None:
+            self.entity_cache.invalidate(guid)
+        if self.name_index is not None:
+            self.name_index.forget(guid)
+        if self.response_cache is not None:
+            self.response_cache.invalidate(guid)
+
+
+    def _cache_scope(self) -> str:
+        """ Keeps response_cache entries from one server or login from being served to another. """
+        return f"{self.username}@{self.mothership_url}"
+
+
+    def _cached_entity(self, object_type: Type[T], guid: str) -> T | None:
+        """ Returns the cached object_type with id guid, or None if we don't have one (or aren't caching). """
+        if self.entity_cache is None:
+            return None
+        return self.entity_cache.get(object_type, guid)
+
+
+    def _cache_entity(self, obj: T) -> T:
+        """ Adds obj to entity_cache, if we have one, and returns it. """
+        if self.entity_cache is not None:
+            self.entity_cache.put(obj)
+        return obj
+
+
+    def _get_by_ids(self, get_by_id: Callable[[str], Optional[T]], ids: Iterable[Union["Id", str]], concurrency: int) -> list[Optional[T]]:
+        """ Runs get_by_id on each distinct id in parallel, mapping 404s to None.  Results are in input order. """
+        from .TbModel import Id
+
+        guids = [entity_id.id if isinstance(entity_id, Id) else entity_id for entity_id in ids]
+
+        def get_or_none(guid: str) -> Optional[T]:
+            try:
+                return get_by_id(guid)
+            except requests.HTTPError as ex:
+                if ex.response is not None and ex.response.status_code == HTTPStatus.NOT_FOUND:
+                    return None
+                raise
+
+        distinct = list(dict.fromkeys(guids))
+        found = dict(zip(distinct, _map_concurrent(get_or_none, distinct, concurrency)))
+        return [found[guid] for guid in guids]
+
+
+    def _find_by_name(
+        self, object_type: Type[U], name: str, newest_first: Callable[[], Iterable[U]], search: Callable[[str], list[U]]
+    ) -> U | None:
+        """
+        Resolves name through name_index if we have one, falling back to a textSearch query (search) for names it doesn't
+        know.  newest_first lists every object_type, newest first, for refreshing the index.
+        """
+        if self.name_index is None:
+            return _exact_match_or_none(name, search(name))
+
+        obj = self.name_index.lookup(object_type, name, newest_first)
+        if obj is not None or self.name_index.trust_misses:
+            return obj
+
+        obj = _exact_match_or_none(name, search(name))
+        if obj is not None:
+            self.name_index.add(obj)
+        return obj
+
+
+    def _newest_first(self, object_type: Type[U], params: str, msg: str) -> Callable[[], Iterator[U]]:
+        """
+        A listing of every object_type at params, newest first, for refreshing name_index.  Refreshes usually stop after
+        the first page, so pages aren't prefetched.
+        """
+        return lambda: self.iter_tb_objects(params, msg, object_type, "created_time desc", prefetch=False)
+
+
     def tb_objects_from_list(self, json_list: list[dict[str, Any]], object_type: Type[T], sort_by: SortClause = None) -> list[T]:
         """
-        Given a list of json strings and a type, return a list of rehydrated objects of that type.
+        Given a list of json strings and a type, return a list of rehydrated objects of that type.  Note that a "tbapi"
+        key gets added to each dict in json_list.
+        Sorting here is always done client-side, even when the server already sorted the data (see _with_server_sort),
+        so None values, bools, and string collation behave the same for every field.  The client sort is linear on
+        data the server has already ordered.
         """
-        objects = [object_type.model_validate(jsn | {"tbapi": self}) for jsn in json_list]
+        for jsn in json_list:
+            jsn["tbapi"] = self         # In place; these dicts are normally fresh off the wire, so copying them is wasted work
+
+        objects = _list_adapter(object_type).validate_python(json_list)      # One call validates the whole batch
+
         return _multisort(objects, sort_by)
 
 
+    def iter_tb_objects(
+        self, params: str, msg: str, object_type: Type[T], sort_by: SortClause = None, prefetch: bool = True
+    ) -> Generator[T, None, None]:
+        """
+        Like tb_objects_from_list(get_paged(...)), but yields objects one page at a time, so only a page or two is ever
+        held in memory.  Mostly intended for internal use.
+
+        sort_by: Since we never hold the whole list, sorting is done by the server, so this must be a single field from
+            object_type.server_sort_properties.  Combined with itertools.islice, this gives cheap top-N queries.
+        prefetch: See iter_paged()
+        """
+        params = _with_server_sort(params, sort_by, object_type, strict=True)       # Outside the generator so errors surface right away
+
+        return (obj for data in self.iter_paged(params, msg, prefetch=prefetch) for obj in self.tb_objects_from_list(data, object_type))
+
+
     # based off https://stackoverflow.com/questions/20658572/python-requests-print-entire-http-request-raw
     @staticmethod
     def pretty_print_request(request: Union[requests.PreparedRequest, requests.Request]):
@@ -553,10 +997,12 @@ class TbApi:
         else:
             headers = "<NO HEADERS>"
 
-        if request.body:
-            body = request.body.decode() if isinstance(request.body, bytes) else request.body
-        else:
+        if not request.body:
             body = "<NO BODY>"
+        elif isinstance(request.body, bytes):
+            body = _printable_body(request.body, request.headers.get("Content-Encoding"))
+        else:
+            body = request.body
 
         print(f"{request.method} {request.path_url}\nHeaders:\n{headers}\nBody:\n{body}")
 
@@ -566,59 +1012,189 @@ class TbApi:
         headers["X-Authorization"] = "Bearer " + self.get_token()
 
 
-    def get_paged(self, params: str, msg: str) -> list[dict[str, Any]]:
-        """ Make requests to get data that might span multiple pages.  Mostly intended for internal use. """
-        page_size = 100
+    def get_paged(self, params: str, msg: str, concurrency: Optional[int] = None, page_size: Optional[int] = None) -> list[dict[str, Any]]:
+        """
+        Make requests to get data that might span multiple pages.  Mostly intended for internal use.
+
+        concurrency: Number of pages to fetch at once; defaults to self.paging_concurrency.  When greater than 1, we read
+            totalPages from the first page, fetch the rest in parallel, and reassemble them in their original order.
+        page_size: Overrides page_sizes, default_page_size, and adaptive_paging for this call.
+        """
         all_data: list[dict[str, Any]] = []
-        page = 0
+        offset = 0          # Number of items requested so far
+        endpoint = params.split("?")[0]
+        fixed_size = page_size is not None
+        page_size = page_size or self._initial_page_size(endpoint)
 
-        if "?" in params:
-            joiner = "&"
-        else:
-            joiner = "?"
+        if concurrency is None:
+            concurrency = self.paging_concurrency
+
+        if concurrency > 1:
+            first = self._get_page(params, msg, 0, page_size)
+            resps = [first] + _map_concurrent(
+                lambda page: self._get_page(params, msg, page, page_size), range(1, first["totalPages"]), concurrency
+            )
+
+            for resp in resps:
+                all_data += resp["data"]
+
+            if not resps[-1]["hasNext"]:
+                return all_data
+
+            # Items were added after we read totalPages; pick up the stragglers one page at a time below
+            offset = len(resps) * page_size
 
         while True:
-            resp = self.get(f"{params}{joiner}page={page}&pageSize={page_size}", msg)
+            if not fixed_size:
+                page_size = self._next_page_size(endpoint, offset, page_size)
+
+            resp = self._get_page(params, msg, offset // page_size, page_size)
             data = resp["data"]
             all_data += data
 
             if not resp["hasNext"]:
                 break
 
-            page += 1
+            offset += page_size
 
         return all_data
 
 
+    def iter_paged(
+        self, params: str, msg: str, page_size: Optional[int] = None, prefetch: bool = True
+    ) -> Generator[list[dict[str, Any]], None, None]:
+        """
+        Generator version of get_paged(): yields the data from one page at a time.  Mostly intended for internal use.
+        prefetch: Request the next page in the background while the caller works on the current one.  Turn this off if
+            the caller usually stops after the first page, so we don't fetch a second one only to throw it away.
+        """
+        endpoint = params.split("?")[0]
+        fixed_size = page_size is not None
+        page_size = page_size or self._initial_page_size(endpoint)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        def request(page: int, size: int) -> Callable[[], dict[str, Any]]:
+            if executor is None:
+                return lambda: self._get_page(params, msg, page, size)     # Fetched only when the caller gets this far
+            return executor.submit(self._get_page, params, msg, page, size).result      # Lookahead
+
+        try:
+            offset = 0
+            next_page: Callable[[], dict[str, Any]] | None = request(0, page_size)
+
+            while next_page:
+                resp = next_page()
+                offset += page_size
+
+                if resp["hasNext"]:
+                    if not fixed_size:
+                        page_size = self._next_page_size(endpoint, offset, page_size)
+                    next_page = request(offset // page_size, page_size)
+                else:
+                    next_page = None
+
+                yield resp["data"]
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)      # In case the caller stopped iterating early
+
+
+    def _initial_page_size(self, endpoint: str) -> int:
+        """ Page size to start a listing of endpoint with: most specific page_sizes entry, else the default. """
+        matches = [prefix for prefix in self.page_sizes if endpoint.startswith(prefix)]
+        page_size = self.page_sizes[max(matches, key=len)] if matches else self.default_page_size
+
+        if self.adaptive_paging:
+            page_size = self.adaptive_paging.page_size(endpoint, page_size)
+
+        return page_size
+
+
+    def _next_page_size(self, endpoint: str, offset: int, page_size: int) -> int:
+        """
+        Page size for the next page of a listing, given how many items we've already requested.  Because pages are
+        addressed by number, we can only switch to a size that offset is a multiple of.
+        """
+        if not self.adaptive_paging:
+            return page_size
+
+        suggested = self.adaptive_paging.page_size(endpoint, page_size)
+        return suggested if offset % suggested == 0 else page_size
+
+
+    def _get_page(self, params: str, msg: str, page: int, page_size: int) -> dict[str, Any]:
+        """ Fetch a single page of a listing, reporting its size and timing to adaptive_paging if that's enabled. """
+        joiner = "&" if "?" in params else "?"
+
+        start = time.perf_counter()
+        content = self.get_raw(f"{params}{joiner}page={page}&pageSize={page_size}", msg)
+        resp = self.json_codec.loads(content)
+
+        if self.adaptive_paging:
+            self.adaptive_paging.observe(params.split("?")[0], page_size, len(resp["data"]), len(content), time.perf_counter() - start)
+
+        return resp
+
+
     def get(self, params: str, msg: str) -> Any:            # list[dict[str, Any]] ??
+        return self.json_codec.loads(self.get_raw(params, msg))
+
+
+    def get_raw(self, params: str, msg: str) -> bytes:
+        """
+        Like get(), but returns the undecoded response body.  With coalesce_gets on, a call made while an identical one
+        is in flight waits for that call's response (or exception) instead of sending its own request.
+        """
         if self.mothership_url is None:     # type: ignore
             raise ConfigurationError("Cannot retrieve data without a URL: create a file called config.py and define 'mothership_url' to point to your Thingsboard server.\nExample: mothership_url = 'http://www.thingsboard.org:8080'")
-        url = self.mothership_url + params
-        headers = {"Accept": "application/json"}
-        self.add_auth_header(headers)
 
-        if self.verbose:
-            req = requests.Request("GET", url, headers=headers)
-            prepared = req.prepare()
-            TbApi.pretty_print_request(prepared)
+        if not self.coalesce_gets:
+            return self._fetch_raw(params, msg)
 
-        response = requests.get(url, headers=headers)
-        self.validate_response(response, msg)
+        with self._in_flight_lock:
+            future = self._in_flight.get(params)
+            if future is None:
+                future = self._in_flight[params] = Future()
+                leader = True
+            else:
+                leader = False
 
-        return response.json()
+        if not leader:
+            self.stats.increment("coalesced")
+            return future.result()
 
+        try:
+            future.set_result(self._fetch_raw(params, msg))
+        except BaseException as ex:
+            future.set_exception(ex)
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[params]
 
-    def delete(self, params: str, msg: str) -> bool:
-        url = self.mothership_url + params
-        headers = {"Accept": "application/json"}
-        self.add_auth_header(headers)
+        return future.result()
 
-        if self.verbose:
-            req = requests.Request("DELETE", url, headers=headers)
-            prepared = req.prepare()
-            TbApi.pretty_print_request(prepared)
 
-        response = requests.delete(url, headers=headers)
+    def _fetch_raw(self, params: str, msg: str) -> bytes:
+        cache = self.response_cache
+        if cache is not None:
+            content = cache.get(params, self._cache_scope())
+            if content is not None:
+                return content
+
+        response = self._send("GET", params, {"Accept": "application/json"})
+        self.validate_response(response, msg)
+
+        if cache is not None:
+            cache.put(params, response.content, self._cache_scope())
+
+        return response.content
+
+
+    def delete(self, params: str, msg: str) -> bool:
+        response = self._send("DELETE", params, {"Accept": "application/json"})
+        if self.response_cache is not None:
+            self.response_cache.invalidate_for_write(params, self._cache_scope())
 
         # Don't fail if not found
         if response.status_code == HTTPStatus.NOT_FOUND:
@@ -629,26 +1205,57 @@ class TbApi:
         return True
 
 
-    def post(self, params: str, data: Optional[Union[str, dict[str, Any]]], msg: str) -> dict[str, Any]:
-        """ Data can be a string or a dict """
-        url = self.mothership_url + params
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
-        self.add_auth_header(headers)
-
-        if self.verbose:
-            req = requests.Request("POST", url, json=data, headers=headers)
-            TbApi.pretty_print_request(req)
+    def post(self, params: str, data: Optional[Union[str, dict[str, Any]]], msg: str, idempotent: bool = False) -> dict[str, Any]:
+        """
+        Data can be a string or a dict; strings are sent as they are, so they must already be valid JSON.  Pass
+        idempotent=True if repeating the request is harmless, so retry_policy may retry it.  Bodies of at least
+        compress_requests_over bytes are gzipped.
+        """
+        body, encoding = _encode_body(data, self.json_codec, self.compress_requests_over)
+        headers = {"Accept": "application/json", "Content-Type": "application/json"} | encoding
 
-        if isinstance(data, str):
-            data = Json.loads(data)
+        resp = self._send("POST", params, headers, idempotent, data=body)
 
-        resp = requests.post(url, json=data, headers=headers)
+        if self.response_cache is not None:
+            self.response_cache.invalidate_for_write(params, self._cache_scope())
         self.validate_response(resp, msg)
 
-        if not resp.text:
+        if not resp.content:
             return {}
 
-        return resp.json()
+        return self.json_codec.loads(resp.content)
+
+
+    def _send(self, method: str, params: str, headers: dict[str, str], idempotent: bool = False, **kwargs: Any) -> requests.Response:
+        """
+        Sends a request with our auth header; kwargs are passed to requests.  If the server rejects our token (it may have
+        been revoked, or expired sooner than expected), we renew it and try once more.  Other failures are retried as
+        retry_policy allows; idempotent marks a POST as safe to repeat.  Every attempt waits its turn with rate_limiter.
+        """
+        url = self.mothership_url + params
+        attempts = _Attempts(self, method, params, idempotent)
+
+        if self.verbose:
+            TbApi.pretty_print_request(requests.Request(method, url, headers=headers, **kwargs))
+
+        while True:
+            token = self.get_token()
+            wait = attempts.rate_limit_wait()
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                response = self.session.request(method, url, headers=headers | {"X-Authorization": "Bearer " + token}, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                delay = attempts.retry_after_error(ex)
+                if delay is None:
+                    raise
+            else:
+                delay = attempts.retry_after_response(response.status_code, response.headers.get("Retry-After"), token)
+                if delay is None:
+                    return response
+
+            time.sleep(delay)
 
 
     @staticmethod
@@ -668,7 +1275,142 @@ class TokenError(Exception):
     pass
 
 
-U = TypeVar("U", "Customer", "Device", "DeviceProfile", "DeviceProfileInfo")
+class _Attempts:
+    """
+    The decisions behind one request's attempts -- rate limiting, re-authenticating on a 401, retrying as retry_policy
+    allows, and counting it all in stats -- so that TbApi._send() and AsyncTbApi._send() only have to do the sending and
+    the waiting.
+    """
+
+    def __init__(self, tbapi: TbApi, method: str, params: str, idempotent: bool):
+        self.tbapi = tbapi
+        self.policy = tbapi.retry_policy if tbapi.retry_policy is not None and tbapi.retry_policy.allows(method, idempotent) else None
+        self.max_attempts = self.policy.max_attempts if self.policy is not None else 1
+        self.endpoint_class = RateLimiter.classify(method, params)
+        self.reauthenticated = False
+        self.attempt = 1
+
+
+    def rate_limit_wait(self) -> float:
+        """ Call before each attempt: takes a rate_limiter slot, and returns how long to wait before sending. """
+        wait = self.tbapi.rate_limiter.reserve(self.endpoint_class) if self.tbapi.rate_limiter is not None else 0
+        if wait > 0:
+            self.tbapi.stats.increment("rate_limited")
+        self.tbapi.stats.increment("requests")
+        return wait
+
+
+    def retry_after_error(self, ex: Exception) -> float | None:
+        """ After a connection error or timeout: how long to wait before trying again, or None to give up and raise. """
+        if self.policy is None or self.attempt >= self.max_attempts:
+            if self.max_attempts > 1:
+                self.tbapi.stats.increment("gave_up")
+            return None
+
+        return self._retry(type(ex).__name__, self.policy.delay(self.attempt))
+
+
+    def retry_after_response(self, status_code: int, retry_after: str | None, token: str) -> float | None:
+        """ After a response: how long to wait before trying again, or None if this response is the one to return. """
+        if status_code == HTTPStatus.UNAUTHORIZED and not self.reauthenticated:
+            self.tbapi._discard_token(token)        # Renewed on the next attempt, which doesn't count against retries
+            self.reauthenticated = True
+            return 0
+
+        if self.policy is None or status_code not in self.policy.retry_statuses:
+            return None
+        if self.attempt >= self.max_attempts:
+            self.tbapi.stats.increment("gave_up")
+            return None
+
+        return self._retry(str(status_code), self.policy.delay(self.attempt, retry_after))
+
+
+    def _retry(self, reason: str, delay: float) -> float:
+        self.tbapi.stats.increment("retries")
+        self.tbapi.stats.increment(f"retries.{reason}")
+        self.attempt += 1
+        return delay
+
+
+def _token_expiry(token: str) -> float | None:
+    """
+    Returns when a JWT expires (epoch time, by our clock), or None if we can't tell.  We go by the token's lifetime
+    (exp - iat) rather than exp itself, so a server clock that disagrees with ours doesn't matter.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = Json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        if "iat" in claims:
+            return time.time() + float(claims["exp"]) - float(claims["iat"])
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):      # Not a JWT, or no exp claim
+        return None
+
+
+def _encode_body(data: Any, codec: JsonCodec, compress_over: int | None) -> tuple[bytes | None, dict[str, str]]:
+    """
+    Serializes data for a request body (strings are taken to be JSON already), gzipped if it's at least compress_over
+    bytes; also returns any headers needed.
+    """
+    if data is None:
+        return None, {}
+
+    body = data.encode() if isinstance(data, str) else codec.dumps(data)
+    if compress_over is None or len(body) < compress_over:
+        return body, {}
+
+    return gzip.compress(body, compresslevel=6), {"Content-Encoding": "gzip"}      # Nearly as small as 9, and much faster
+
+
+def _printable_body(body: bytes, content_encoding: str | bytes | None) -> str:
+    """ body as text for verbose output, or a placeholder if it's compressed or otherwise not text """
+    if content_encoding:
+        encoding = content_encoding.decode() if isinstance(content_encoding, bytes) else content_encoding
+        return f"<{encoding}, {len(body)} bytes>"
+    try:
+        return body.decode()
+    except UnicodeDecodeError:
+        return f"<binary, {len(body)} bytes>"
+
+
+def _active_clause(is_active: Optional[bool]) -> str:
+    """ Query string for filtering devices by active status; empty if is_active is None. """
+    if is_active == True:       # noqa: E712
+        return "?active=true"
+    elif is_active == False:    # noqa: E712
+        return "?active=false"
+    else:
+        return ""
+
+
+R = TypeVar("R")
+
+def _map_concurrent(func: Callable[[Any], R], items: Iterable[Any], concurrency: int) -> list[R]:
+    """ Like map(), but runs func on up to concurrency items at once.  Results are returned in input order. """
+    items = list(items)
+    if concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def _chunk_ids(base_url: str, guids: list[str]) -> Iterator[list[str]]:
+    """ Splits guids into runs that, joined with commas and appended to base_url, stay under MAX_URL_LENGTH. """
+    chunk: list[str] = []
+    length = len(base_url)
+
+    for guid in guids:
+        if chunk and length + len(guid) + 1 > MAX_URL_LENGTH:
+            yield chunk
+            chunk, length = [], len(base_url)
+        chunk.append(guid)
+        length += len(guid) + 1
+
+    if chunk:
+        yield chunk
+
 
 def _exact_match_or_none(name: str, object_list: list[U]) -> Optional[U]:
     matches: list[U] = []
@@ -687,26 +1429,90 @@ def _exact_match_or_none(name: str, object_list: list[U]) -> Optional[U]:
     return matches[0]
 
 
-# See https://stackoverflow.com/questions/61452346/python-attrgetter-that-handles-none-values-and-can-be-used-in-a-loop
-def _none_aware_attrgetter(attr: str):
+def _with_server_sort(params: str, sorting: SortClause, object_type: Type["TbObject"], strict: bool = False) -> str:
     """
-    Like attrgetter, but sorts None values last (instead of crashing).
-    Id and tenant_id field now handled by implicit id sorting.
+    Adds sortProperty/sortOrder to a paged request if the first field in sorting is one the server can sort on (see
+    TbObject.server_sort_properties), so pages arrive already ordered.  Only one field can be pushed to the server.
+    strict: Raise a ValueError if sorting can't be done entirely by the server (needed when we can't re-sort afterward)
     """
+    sort_params = _parse_sort_clause(sorting)
+    if not sort_params:
+        return params
 
-    from .TbModel import TbObject
+    attr, reverse = sort_params[0]
+    server_property = object_type.server_sort_properties.get(attr)
 
-    getter = operator.attrgetter(attr)
+    if strict and (server_property is None or len(sort_params) > 1):
+        sortable = ", ".join(object_type.server_sort_properties) or "nothing"
+        raise ValueError(f"{object_type.__name__} can only be sorted by a single one of these fields here: {sortable}")
 
-    def key_func(item: TbObject) -> tuple[bool, Any | None]:
-        value = getter(item)
-        if isinstance(value, bool):
-            return (False, not value)    # sort bools with True first, then False, which is opposite of Python default order
-        return (value is None, value)
-    return key_func
+    if server_property is None:
+        return params
+
+    joiner = "&" if "?" in params else "?"
+    return f"{params}{joiner}sortProperty={server_property}&sortOrder={'DESC' if reverse else 'ASC'}"
 
 
 # See https://stackoverflow.com/questions/61452346/python-attrgetter-that-handles-none-values-and-can-be-used-in-a-loop
+def _none_aware_key_columns(values: list[Any]) -> list[list[Any]]:
+    """
+    Turns a column of field values into one or two columns of sort keys that put None values last (instead of
+    crashing) and True before False.  When there are Nones, the first column flags them, so no per-value tuples are
+    needed.  Id and tenant_id fields are keyed by their guid, which is what Id.__lt__ compares, but without the
+    Python-level calls.  Columns that need none of that special handling (the usual case) are returned as-is.
+    """
+    from .TbModel import Id
+
+    types = set(map(type, values))
+
+    if bool in types or any(issubclass(t, Id) for t in types):
+        def key_func(value: Any) -> Any:
+            if value.__class__ is bool:
+                return not value    # sort bools with True first, then False, which is opposite of Python default order
+            if isinstance(value, Id):
+                return value.id
+            return value
+
+        values = list(map(key_func, values))
+
+    if type(None) in types:
+        return [[value is None for value in values], values]
+
+    return [values]
+
+
+def _negated_ranks(column: list[Any]) -> list[int]:
+    """
+    Replaces each key in column with the negative of its rank (equal keys share a rank), so sorting the ranks ascending
+    orders the original keys descending.  This is how fields that run against the overall sort direction get folded
+    into a composite key made entirely of natively comparable values.
+    """
+    try:
+        ranks = {key: -rank for rank, key in enumerate(sorted(set(column)))}
+        return [ranks[key] for key in column]
+    except TypeError:       # Unhashable keys; rank them the slow way
+        pass
+
+    negated_ranks = [0] * len(column)
+    rank = 0
+    previous: Any = object()
+
+    for i in sorted(range(len(column)), key=column.__getitem__):
+        if column[i] != previous:
+            rank -= 1
+            previous = column[i]
+        negated_ranks[i] = rank
+
+    return negated_ranks
+
+
+@cache
+def _list_adapter(object_type: Type[T]) -> TypeAdapter[list[T]]:
+    """ Building an adapter is expensive, so we keep one per type. """
+    list_type: Any = list                   # Any, because type checkers won't take a type only known at runtime in list[...]
+    return TypeAdapter(list_type[object_type])
+
+
 def _multisort(lst: list[T], sorting: SortClause) -> list[T]:
     """
     sorting:
@@ -714,10 +1520,43 @@ def _multisort(lst: list[T], sorting: SortClause) -> list[T]:
         - tuple: (field_name, sort_order) where sort_order is True for descending, False for ascending
         - list[str | tuple[str, bool]]: list of field names or (field, reverse) tuples
         if a sort field has a None value, those items will be sorted last
+
+    Sorts in a single pass over one precomputed composite key per object.  Keys are built a column (field) at a time;
+    the first field's direction sets the direction of the whole sort, and any field running the other way is replaced
+    by its negated rank.  Stable, like any Python sort.
     """
     if sorting is None:     # No sorting
         return lst
 
+    sort_params = _parse_sort_clause(sorting)
+    if not sort_params or not lst:
+        return lst
+
+    invert = sort_params[0][1]
+
+    columns: list[list[Any]] = []
+    for attr, reverse in sort_params:
+        field_columns = _none_aware_key_columns(list(map(operator.attrgetter(attr), lst)))
+
+        if reverse != invert:
+            field_keys = field_columns[0] if len(field_columns) == 1 else list(zip(*field_columns))
+            columns.append(_negated_ranks(field_keys))
+        else:
+            columns += field_columns
+
+    keys = columns[0] if len(columns) == 1 else list(zip(*columns))
+
+    order = sorted(range(len(lst)), key=keys.__getitem__, reverse=invert)
+    lst[:] = [lst[i] for i in order]
+
+    return lst
+
+
+def _parse_sort_clause(sorting: SortClause) -> list[tuple[str, bool]]:
+    """ Normalize any of the forms a SortClause can take into a list of (field_name, reverse) tuples. """
+    if sorting is None:
+        return []
+
     sort_params: list[tuple[str, bool]] = []
 
     if isinstance(sorting, (str, tuple)):        # Make sure we have a list to iterate over below
@@ -734,8 +1573,4 @@ def _multisort(lst: list[T], sorting: SortClause) -> list[T]:
         else:       # We have a tuple that, hopefully, looks like what we're creating above
             sort_params.append(sort_item)
 
-    # Sort in reverse-parameter order to handle multi-level sort
-    for attr, reverse in reversed(sort_params):
-        lst.sort(key=_none_aware_attrgetter(attr), reverse=reverse)
-
-    return lst
+    return sort_params
@@ -15,7 +15,7 @@
 # COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from typing import  Dict, Any
+from typing import  Dict, Any, ClassVar
 from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel, Field, ConfigDict
@@ -81,6 +81,9 @@ class TbObject(TbModel):
 
     tbapi: "TbApi" = Field(exclude=True)        # exclude=True --> don't serialize this field
 
+    # Fields the server can sort listings of this type by: {our field name: TB sortProperty}
+    server_sort_properties: ClassVar[dict[str, str]] = {}
+
 
     def __str__(self) -> str:
         name: str = ""
@@ -0,0 +1,50 @@
+from operator import itemgetter
+from typing import Any, NamedTuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np      # pip install numpy
+
+
+class TelemetryColumns(NamedTuple):
+    """ One key's telemetry as parallel arrays, oldest or newest first as the points were given """
+    ts: "np.ndarray"            # int64 milliseconds since the epoch
+    values: "np.ndarray"        # float64 if every value is an int or float (missing values become NaN), object otherwise
+
+
+def to_columns(telemetry: dict[str, list[dict[str, Any]]]) -> dict[str, TelemetryColumns]:
+    """
+    Converts the {key: [{"ts": ..., "value": ...}, ...]} returned by get_telemetry(), get_latest_telemetry(),
+    get_telemetry_chunked() and the like into a TelemetryColumns per key.  Needs numpy.
+    """
+    import numpy as np      # pip install numpy
+
+    columns: dict[str, TelemetryColumns] = {}
+
+    for key, points in telemetry.items():
+        try:
+            ts = np.fromiter(map(_ts, points), dtype=np.int64, count=len(points))
+        except TypeError:       # Keys with no data at all come back with a null ts; drop those points
+            points = [point for point in points if point.get("ts") is not None]
+            ts = np.fromiter(map(_ts, points), dtype=np.int64, count=len(points))
+
+        columns[key] = TelemetryColumns(ts, _values(np, points))
+
+    return columns
+
+
+_ts = itemgetter("ts")
+
+
+def _values(np: Any, points: list[dict[str, Any]]) -> "np.ndarray":
+    """
+    float64 if every value is an int, float, or None (which becomes NaN); object otherwise.  Strings stay strings, even
+    ones that look like numbers (we ask for strict data types, so "00123" was sent as a string), and bools stay bools.
+    """
+    raw = [point["value"] for point in points]
+
+    if all(type(value) in (int, float) or value is None for value in raw):      # type() rather than isinstance() to exclude bools
+        return np.fromiter((np.nan if value is None else value for value in raw), dtype=np.float64, count=len(raw))
+
+    values = np.empty(len(raw), dtype=object)
+    values[:] = raw
+    return values
@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import Any, Iterator, Optional, TYPE_CHECKING
+
+from .Device import Timestamp, prepare_ts, telemetry_params
+
+if TYPE_CHECKING:
+    from .TbApi import TbApi
+
+
+class TelemetryCursor:
+    """
+    Walks every point of one telemetry key for one device, a page at a time, by moving the start of the time range (or
+    the end, if descending) past the last point received.  It never needs to know the range or density ahead of time,
+    and never holds more than one page.
+
+    position is the timestamp of the last point handed out.  Save it, and pass it back as after (going the same
+    direction) to carry on from there later:
+
+        cursor = device.iter_telemetry("temperature", after=saved_position)
+        for point in cursor:
+            process(point)
+        saved_position = cursor.position
+
+    Iterating the same cursor again also carries on from position.  Usually created with Device.iter_telemetry().
+    """
+
+    def __init__(
+        self,
+        tbapi: "TbApi",
+        device_id: str,
+        key: str,
+        start_ts: Optional[Timestamp] = None,
+        end_ts: Optional[Timestamp] = None,
+        page_size: int = 1000,
+        descending: bool = False,
+        after: Optional[int] = None,
+    ):
+        """
+        start_ts, end_ts: Range to walk; defaults to all history up to the time iteration starts
+        after: A position saved from an earlier cursor; only points beyond it (in the direction of travel) are returned
+        """
+        self.tbapi = tbapi
+        self.device_id = device_id
+        self.key = key
+        self.start_ts = prepare_ts(start_ts) if start_ts is not None else 0
+        self.end_ts = prepare_ts(end_ts) if end_ts is not None else None
+        self.page_size = page_size
+        self.descending = descending
+        self.position = after
+
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """ Points, one at a time, in get_telemetry()'s {"ts": ..., "value": ...} form """
+        for page in self._pages():
+            for point in page:
+                self.position = point["ts"]
+                yield point
+
+
+    def blocks(self) -> Iterator[list[dict[str, Any]]]:
+        """ Points a page (of at most page_size) at a time """
+        for page in self._pages():
+            self.position = page[-1]["ts"]
+            yield page
+
+
+    def _pages(self) -> Iterator[list[dict[str, Any]]]:
+        start = self.start_ts
+        end = self.end_ts if self.end_ts is not None else prepare_ts(datetime.now())
+        order_by = "DESC" if self.descending else "ASC"
+
+        while True:
+            if self.position is not None:       # Updated by our callers as they consume each page
+                if self.descending:
+                    end = min(end, self.position)
+                else:
+                    start = max(start, self.position + 1)
+            if start >= end:
+                return
+
+            params = telemetry_params(self.device_id, self.key, start, end, limit=self.page_size, order_by=order_by)
+            received = self.tbapi.get(params, f"Error retrieving telemetry for device '{self.device_id}' with params '{params}'").get(self.key, [])
+
+            # Drop anything we've already handed out, in case the server treats the range as inclusive
+            page = [point for point in received if self.position is None or (point["ts"] < self.position if self.descending else point["ts"] > self.position)]
+            if not page:
+                return
+
+            yield page
+
+            if len(received) < self.page_size:
+                return
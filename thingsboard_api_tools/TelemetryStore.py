@@ -0,0 +1,183 @@
+import json as Json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Iterable, Optional, Union, TYPE_CHECKING
+
+from .Device import Timestamp, prepare_ts, get_telemetry_chunked
+
+if TYPE_CHECKING:
+    from .TbApi import TbApi
+    from .TbModel import Id
+
+
+class TelemetryStore:
+    """
+    A local SQLite copy of device telemetry, so jobs that keep looking at the same history don't download it again
+    every run.  For each device and key it remembers which time ranges it holds in full; get_telemetry() fetches only
+    the parts of the requested range it doesn't have, then answers from the file:
+
+        store = TelemetryStore(tbapi, "telemetry.sqlite")
+        tel = store.get_telemetry(device.id, ["temperature", "humidity"], start_ts=datetime.now() - timedelta(days=30))
+
+    Run that again tomorrow and only the last day (plus settle_seconds) is fetched.  Points newer than settle_seconds
+    are stored but not counted as covered, so data that reaches the server late is picked up by the next sync.
+    """
+
+    def __init__(self, tbapi: "TbApi", path: str, settle_seconds: float = 5 * 60):
+        """
+        path: SQLite file to keep the telemetry in; created if needed
+        settle_seconds: How far back from now to keep refetching, for devices that report late
+        """
+        self.tbapi = tbapi
+        self.settle_seconds = settle_seconds
+
+        self._db = sqlite3.connect(path, check_same_thread=False)        # Access is serialized with _lock
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS points (device_id TEXT, key TEXT, ts INTEGER, value TEXT, PRIMARY KEY (device_id, key, ts)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS coverage (device_id TEXT, key TEXT, start_ts INTEGER, end_ts INTEGER);
+            CREATE INDEX IF NOT EXISTS coverage_by_key ON coverage (device_id, key);
+        """)
+        self._lock = threading.Lock()
+
+
+    def sync(
+        self,
+        device_id: Union["Id", str],
+        keys: Union[str, Iterable[str]],
+        start_ts: Timestamp,
+        end_ts: Optional[Timestamp] = None,
+        limit: int = 10_000,
+        concurrency: int = 4,
+    ) -> int:
+        """
+        Fetches whatever part of [start_ts, end_ts) we don't already hold for these keys, using
+        Device.get_telemetry_chunked() so nothing is truncated.  Returns the number of points fetched.
+        """
+        guid, keys = _guid(device_id), _keys(keys)
+        start = prepare_ts(start_ts)
+        now = prepare_ts(datetime.now())
+        end = prepare_ts(end_ts) if end_ts is not None else now
+        settled = min(end, now - int(self.settle_seconds * 1000))
+
+        # Keys usually share the same gaps (typically, everything since the last sync), so fetch those together
+        keys_by_gap: dict[tuple[int, int], list[str]] = {}
+        for key in keys:
+            for gap in self._gaps(guid, key, start, end):
+                keys_by_gap.setdefault(gap, []).append(key)
+
+        fetched = 0
+        for (gap_start, gap_end), gap_keys in keys_by_gap.items():
+            telemetry = get_telemetry_chunked(self.tbapi, guid, gap_keys, gap_start, gap_end, limit=limit, concurrency=concurrency)
+            fetched += sum(len(points) for points in telemetry.values())
+
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?)",
+                    ((guid, key, point["ts"], Json.dumps(point["value"])) for key, points in telemetry.items() for point in points),
+                )
+                if min(gap_end, settled) > gap_start:
+                    for key in gap_keys:
+                        self._add_coverage(guid, key, gap_start, min(gap_end, settled))
+
+        return fetched
+
+
+    def get_telemetry(
+        self,
+        device_id: Union["Id", str],
+        keys: Union[str, Iterable[str]],
+        start_ts: Timestamp,
+        end_ts: Optional[Timestamp] = None,
+        sync: bool = True,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """
+        Every point in [start_ts, end_ts), in Device.get_telemetry()'s shape: newest first per key, keys with no points
+        left out.  Unless sync is False, missing ranges are fetched first; otherwise you get only what's stored.
+        """
+        guid, keys = _guid(device_id), _keys(keys)
+        end_ts = end_ts if end_ts is not None else datetime.now()
+
+        if sync:
+            self.sync(guid, keys, start_ts, end_ts)
+
+        result: dict[str, list[dict[str, Any]]] = {}
+        with self._lock:
+            for key in keys:
+                rows = self._db.execute(
+                    "SELECT ts, value FROM points WHERE device_id = ? AND key = ? AND ts >= ? AND ts < ? ORDER BY ts DESC",
+                    (guid, key, prepare_ts(start_ts), prepare_ts(end_ts)),
+                ).fetchall()
+                if rows:
+                    result[key] = [{"ts": ts, "value": Json.loads(value)} for ts, value in rows]
+
+        return result
+
+
+    def coverage(self, device_id: Union["Id", str], key: str) -> list[tuple[int, int]]:
+        """ The [start, end) ranges, in ms, that we hold every point for """
+        with self._lock:
+            return self._coverage(_guid(device_id), key)
+
+
+    def forget(self, device_id: Union["Id", str], keys: Union[str, Iterable[str], None] = None) -> None:
+        """ Drops what we hold for a device: just the given keys, or everything. """
+        guid = _guid(device_id)
+        with self._lock, self._db:
+            for table in ("points", "coverage"):
+                if keys is None:
+                    self._db.execute(f"DELETE FROM {table} WHERE device_id = ?", (guid,))
+                else:
+                    self._db.executemany(f"DELETE FROM {table} WHERE device_id = ? AND key = ?", [(guid, key) for key in _keys(keys)])
+
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+    def _gaps(self, guid: str, key: str, start: int, end: int) -> list[tuple[int, int]]:
+        """ The parts of [start, end) that coverage doesn't include """
+        with self._lock:
+            covered = self._coverage(guid, key)
+
+        gaps: list[tuple[int, int]] = []
+        for covered_start, covered_end in covered:
+            if covered_end <= start:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > start:
+                gaps.append((start, covered_start))
+            start = max(start, covered_end)
+
+        if start < end:
+            gaps.append((start, end))
+        return gaps
+
+
+    def _coverage(self, guid: str, key: str) -> list[tuple[int, int]]:
+        """ Caller must hold the lock. """
+        return self._db.execute(
+            "SELECT start_ts, end_ts FROM coverage WHERE device_id = ? AND key = ? ORDER BY start_ts", (guid, key)
+        ).fetchall()
+
+
+    def _add_coverage(self, guid: str, key: str, start: int, end: int) -> None:
+        """ Records [start, end) as covered, merging it with any ranges it overlaps or touches.  Caller must hold the lock. """
+        overlaps = "device_id = ? AND key = ? AND start_ts <= ? AND end_ts >= ?"
+        params = (guid, key, end, start)
+
+        for covered_start, covered_end in self._db.execute(f"SELECT start_ts, end_ts FROM coverage WHERE {overlaps}", params).fetchall():
+            start, end = min(start, covered_start), max(end, covered_end)
+
+        self._db.execute(f"DELETE FROM coverage WHERE {overlaps}", params)
+        self._db.execute("INSERT INTO coverage VALUES (?, ?, ?, ?)", (guid, key, start, end))
+
+
+def _guid(device_id: Union["Id", str]) -> str:
+    return device_id if isinstance(device_id, str) else device_id.id
+
+
+def _keys(keys: Union[str, Iterable[str]]) -> list[str]:
+    return keys.split(",") if isinstance(keys, str) else list(keys)
@@ -16,7 +16,7 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
-from typing import  Optional, Dict, Any
+from typing import  Optional, Dict, Any, ClassVar
 from pydantic import Field
 
 try:
@@ -41,6 +41,19 @@ class Tenant(TbObject, HasAttributes):
     phone: Optional[str]
     additional_info: Optional[Dict[str, Any]] = Field(alias="additionalInfo")
 
+    server_sort_properties: ClassVar[dict[str, str]] = {
+        "name": "title",
+        "email": "email",
+        "country": "country",
+        "state": "state",
+        "city": "city",
+        "address": "address",
+        "address2": "address2",
+        "zip": "zip",
+        "phone": "phone",
+        "created_time": "createdTime",
+    }
+
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Tenant):       # Probably superfluous -- ids are guids so won't collide
@@ -53,11 +66,14 @@ class Tenant(TbObject, HasAttributes):
         """
         Deletes the tenant from the server, returns True if tenant was deleted, False if it did not exist
         """
+        self.tbapi.invalidate_cached(self.id)
         return self.tbapi.delete(f"/api/tenant/{self.id.id}", f"Error deleting tenant '{self.id.id}'")
 
 
     def update(self):
-        return self.tbapi.post("/api/tenant", self.model_dump_json(by_alias=True), "Error updating tenant")
+        result = self.tbapi.post("/api/tenant", self.model_dump_json(by_alias=True), "Error updating tenant")
+        self.tbapi.invalidate_cached(self.id)
+        return result
 
 
     def one_line_address(self) -> str:
@@ -19,17 +19,31 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 from .TbApi import TbApi, SortOrder
+from .AsyncTbApi import AsyncTbApi
 from .TbModel import TbObject, TbModel, Id, Attributes
 from .Customer import Customer, CustomerId
 from .Dashboard import DashboardHeader, Dashboard
-from .Device import Device, AggregationType
+from .Device import Device, AggregationType, TelemetryRow
 from .DeviceProfile import DeviceProfile, DeviceProfileInfo
 from .TelemetryRecord import TelemetryRecord
+from .TelemetryCursor import TelemetryCursor
+from .TelemetryColumns import TelemetryColumns, to_columns
+from .TelemetryStore import TelemetryStore
 from .EntityType import EntityType
+from .EntityDataQuery import EntityDataQuery, EntityDataRecord, EntityKeyType, LatestValue
+from .PageSizer import AdaptivePageSizer
+from .EntityCache import EntityCache
+from .NameIndex import NameIndex
+from .RetryPolicy import RetryPolicy
+from .RateLimiter import RateLimiter, EndpointClass
+from .ResponseCache import ResponseCache
+from .RequestStats import RequestStats
 
 
 __all__ = [
+    "AdaptivePageSizer",
     "AggregationType",
+    "AsyncTbApi",
     "Attributes",
     "Customer",
     "CustomerId",
@@ -38,11 +52,27 @@ __all__ = [
     "Device",
     "DeviceProfile",
     "DeviceProfileInfo",
+    "EntityCache",
+    "EndpointClass",
+    "EntityDataQuery",
+    "EntityDataRecord",
+    "EntityKeyType",
     "EntityType",
     "Id",
+    "LatestValue",
+    "NameIndex",
     "TbApi",
     "TbModel",
     "TbObject",
+    "TelemetryColumns",
+    "TelemetryCursor",
     "TelemetryRecord",
+    "TelemetryRow",
+    "TelemetryStore",
+    "RateLimiter",
+    "ResponseCache",
+    "RequestStats",
+    "RetryPolicy",
     "SortOrder",
+    "to_columns",
 ]